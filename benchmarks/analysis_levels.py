@@ -0,0 +1,30 @@
+"""
+Measure how long `ChatService.prepare_response` takes per level of analysis.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/analysis_levels.py
+"""
+import timeit
+
+from language_corpus import SAMPLES
+
+from custom_components.openai_service.const import ANALYSIS_LEVELS
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+ROUNDS = 50
+REPLY = " ".join(text for _, text in SAMPLES[:6])
+
+
+def main() -> None:
+    """Print the average analysis time of a six sentence reply per level."""
+    ChatService.prepare_response(REPLY)
+    for level in ANALYSIS_LEVELS:
+        seconds = timeit.timeit(
+            lambda l=level: ChatService.prepare_response(REPLY, analysis=l),
+            number=ROUNDS,
+        )
+        print(f"{level:>9}: {seconds / ROUNDS * 1000:7.3f} ms per response")
+
+
+if __name__ == "__main__":
+    main()
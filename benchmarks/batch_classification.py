@@ -0,0 +1,45 @@
+"""
+Compare per-sentence language classification with the batched
+`ChatService.identify_languages` for replies of 1 to 50 sentences,
+and check that both produce identical results.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/batch_classification.py
+"""
+import itertools
+import timeit
+
+from language_corpus import SAMPLES
+
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+SENTENCE_COUNTS = (1, 5, 10, 25, 50)
+ROUNDS = 20
+
+
+def main() -> None:
+    """Print the time per reply for the loop and the batched classification."""
+    texts = [text for _, text in SAMPLES]
+    for languages in (None, ("de", "en")):
+        for count in SENTENCE_COUNTS:
+            sentences = list(itertools.islice(itertools.cycle(texts), count))
+            looped = [ChatService.identify_language(s, languages) for s in sentences]
+            batched = ChatService.identify_languages(sentences, languages)
+            loop_time = timeit.timeit(
+                lambda s=sentences, l=languages: [ChatService.identify_language(t, l) for t in s],
+                number=ROUNDS,
+            )
+            batch_time = timeit.timeit(
+                lambda s=sentences, l=languages: ChatService.identify_languages(s, l),
+                number=ROUNDS,
+            )
+            print(
+                f"{'all' if languages is None else '+'.join(languages):>6} "
+                f"{count:3d} sentences: loop {loop_time / ROUNDS * 1000:7.2f} ms, "
+                f"batch {batch_time / ROUNDS * 1000:7.2f} ms, "
+                f"identical: {looped == batched}"
+            )
+
+
+if __name__ == "__main__":
+    main()
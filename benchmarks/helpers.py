@@ -0,0 +1,41 @@
+"""
+Helpers to drive `OpenAIService` outside of a running Home Assistant instance.
+"""
+from __future__ import annotations
+
+import tempfile
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import Context, HomeAssistant, ServiceCall
+
+from custom_components.openai_service.const import DOMAIN
+from custom_components.openai_service.integrations.openai_service import OpenAIService
+
+
+def create_service(
+    hass: HomeAssistant, url: str, options: dict | None = None, data: dict | None = None
+) -> OpenAIService:
+    """Create an `OpenAIService` for a custom endpoint at `url`. `data` is
+    added to the entry data."""
+    entry = ConfigEntry(
+        version=1,
+        minor_version=0,
+        domain=DOMAIN,
+        title="benchmark",
+        data={"name": "benchmark", "url": url, "endpoint_type": "custom", **(data or {})},
+        source="user",
+        options=options or {},
+    )
+    return OpenAIService(hass, entry)
+
+
+def create_hass() -> HomeAssistant:
+    """Create a bare Home Assistant instance. Must be called inside the event loop."""
+    return HomeAssistant(tempfile.mkdtemp())
+
+
+def service_call(**data) -> ServiceCall:
+    """Build a `send_request` service call with `data`."""
+    data.setdefault("stream", False)
+    data.setdefault("bypass_cache", False)
+    return ServiceCall(DOMAIN, "send_request", data, Context(), return_response=True)
@@ -0,0 +1,52 @@
+"""
+Measure what importing the integration adds to Home Assistant's startup and
+how long the background warm-up takes.
+
+Every measurement runs in a fresh interpreter, with the Home Assistant
+modules the integration needs already imported, as they are at startup.
+Home Assistant also imports the config flow and sensor platform at startup.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/import_time.py
+"""
+import json
+import subprocess
+import sys
+
+ROUNDS = 5
+HEAVY_MODULES = ("openai", "httpx", "numpy", "pysbd", "langid")
+SCRIPT = """
+import json, sys, time
+import homeassistant.components.sensor, homeassistant.config_entries
+import homeassistant.helpers.config_validation, homeassistant.helpers.start
+started = time.perf_counter()
+import custom_components.openai_service
+import custom_components.openai_service.config_flow
+import custom_components.openai_service.sensor
+from custom_components.openai_service.integrations.openai_service import OpenAIService
+imported = time.perf_counter() - started
+loaded = [name for name in {heavy!r} if name in sys.modules]
+started = time.perf_counter()
+OpenAIService.warm_up()
+warm_up = time.perf_counter() - started
+print(json.dumps({{"import": imported, "loaded": loaded, "warm_up": warm_up}}))
+""".format(heavy=HEAVY_MODULES)
+
+
+def main() -> None:
+    """Print the median import and warm-up time over a few fresh interpreters."""
+    runs = [
+        json.loads(subprocess.run(
+            [sys.executable, "-c", SCRIPT], capture_output=True, check=True, text=True
+        ).stdout)
+        for _ in range(ROUNDS)
+    ]
+    imports = sorted(run["import"] for run in runs)
+    warm_ups = sorted(run["warm_up"] for run in runs)
+    print(f"import of the integration: {imports[ROUNDS // 2] * 1000:7.1f} ms")
+    print(f"heavy modules loaded by the import: {', '.join(runs[0]['loaded']) or 'none'}")
+    print(f"warm up after start:       {warm_ups[ROUNDS // 2] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+A small labelled corpus of sentences as they typically appear in assistant
+replies of a german/english speaking household.
+"""
+
+SAMPLES = [
+    ("de", "Wann es dunkel wird, hängt vom Standort und der Jahreszeit ab."),
+    ("de", "In Deutschland beginnt die Nacht im Sommer um ca. 21 Uhr."),
+    ("de", "Die genaue Zeit variiert je nach Breitengrad und Saison."),
+    ("de", "Hier kannst du deinen Ort eingeben und das Datum auswählen."),
+    ("de", "Das Licht im Wohnzimmer ist jetzt aus."),
+    ("de", "Morgen wird es sonnig bei 24 Grad."),
+    ("de", "Die Waschmaschine ist fertig."),
+    ("de", "Vergiss nicht, den Müll rauszubringen."),
+    ("de", "Gute Nacht!"),
+    ("de", "Alles klar."),
+    ("de", "Bitte schön."),
+    ("de", "Die Haustür ist abgeschlossen."),
+    ("de", "Im Kinderzimmer sind es 21 Grad."),
+    ("de", "Es regnet gerade in Berlin."),
+    ("de", "Ich habe den Timer auf zehn Minuten gestellt."),
+    ("en", "The average distance from the Moon to Earth is about 238,900 miles."),
+    ("en", "This measurement varies because the Moon's orbit is not a perfect circle."),
+    ("en", "In english: When will it be dark?"),
+    ("en", "The living room light is now off."),
+    ("en", "Tomorrow will be sunny with a high of 75 degrees."),
+    ("en", "The washing machine has finished."),
+    ("en", "Don't forget to take out the trash."),
+    ("en", "Good night!"),
+    ("en", "Sure thing."),
+    ("en", "You're welcome."),
+    ("en", "The front door is locked."),
+    ("en", "It is 21 degrees in the kids' room."),
+    ("en", "It is raining in London right now."),
+    ("en", "I set a timer for ten minutes."),
+    ("en", "Have a great day."),
+]
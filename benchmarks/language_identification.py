@@ -0,0 +1,55 @@
+"""
+Measure the per-response cost of the language classification pipeline.
+
+Compares building a new langid `LanguageIdentifier` for every classification
+(the behaviour before the identifier was shared) with the shared instance
+returned by `ChatService.get_identifier()`.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/language_identification.py
+"""
+import timeit
+
+from langid.langid import LanguageIdentifier, model
+
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+SAMPLE_RESPONSE = (
+    "Wann es dunkel wird, hängt vom Tagesstandort und der Jahreszeit ab. "
+    "In Deutschland beginnt die Nacht allgemein um 20 Uhr im Sommer und um 16 Uhr im Winter. "
+    "Die genaue Zeit variiert je nach Breitegrad und Saison. "
+    "Hier kannst du deinen Ort eingeben und das Datum auswählen. "
+    "In english: When will it be dark?"
+)
+ROUNDS = 3
+
+
+def classify_rebuilding(text: str) -> dict:
+    """Classify the response and each sentence with a fresh identifier per call."""
+
+    def identify(value: str) -> tuple:
+        identifier = LanguageIdentifier.from_modelstring(model, norm_probs=True)
+        return identifier.classify(value)
+
+    overall = identify(text)
+    sentences = ChatService.segment_text(text, overall[0])
+    return {"language": overall, "sentences": [identify(s) for s in sentences]}
+
+
+def classify_shared(text: str) -> dict:
+    """Classify the response and each sentence with the shared identifier."""
+    overall = ChatService.identify_language(text)
+    sentences = ChatService.segment_text(text, overall[0])
+    return {"language": overall, "sentences": ChatService.language_per_sentence(sentences)}
+
+
+def main() -> None:
+    """Print the average time per analysed response for both strategies."""
+    ChatService.get_identifier()
+    for name, func in (("rebuilding", classify_rebuilding), ("shared", classify_shared)):
+        seconds = timeit.timeit(lambda f=func: f(SAMPLE_RESPONSE), number=ROUNDS)
+        print(f"{name:>12}: {seconds / ROUNDS * 1000:8.2f} ms per response")
+
+
+if __name__ == "__main__":
+    main()
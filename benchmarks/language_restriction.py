@@ -0,0 +1,37 @@
+"""
+Measure classification time and accuracy of language identification with
+all langid languages versus a restricted language set.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/language_restriction.py
+"""
+import timeit
+
+from language_corpus import SAMPLES
+
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+LANGUAGE_SETS = {"all": None, "de+en": ("de", "en")}
+ROUNDS = 20
+
+
+def main() -> None:
+    """Print average classification time and accuracy per language set."""
+    for name, languages in LANGUAGE_SETS.items():
+        ChatService.get_identifier(languages)
+        correct = sum(
+            ChatService.identify_language(text, languages)[0] == expected
+            for expected, text in SAMPLES
+        )
+        seconds = timeit.timeit(
+            lambda l=languages: [ChatService.identify_language(t, l) for _, t in SAMPLES],
+            number=ROUNDS,
+        )
+        print(
+            f"{name:>6}: {seconds / ROUNDS / len(SAMPLES) * 1e6:8.1f} µs per sentence, "
+            f"accuracy {correct}/{len(SAMPLES)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measure the time to the first token with and without the `prompt_cache`
+option against a stub server that evaluates prompts like llama.cpp.
+
+Every request starts with a long mood. Without the option the stub evaluates
+the whole prompt every time, with it only the new message. The last run
+continues a conversation, whose earlier turns follow the mood, so only the
+newest turns are evaluated.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/prompt_cache.py
+"""
+import asyncio
+
+from helpers import create_hass, create_service, service_call
+from stub_server import StubServer
+
+CALLS = 20
+# Seconds per prompt token, a small model on a single board computer is slower.
+PROMPT_LATENCY = 0.0005
+MOOD = " ".join(
+    ["You are the voice assistant of a smart home. Answer in one short sentence."] * 30
+)
+
+
+async def run(server: StubServer, hass, prompt_cache: bool, conversation: bool):
+    """Sends `CALLS` streamed requests and prints the time to the first token."""
+    openai_service = create_service(
+        hass, server.url, {"mood": MOOD, "prompt_cache": prompt_cache}
+    )
+    evaluated = server.evaluated_tokens
+    for number in range(CALLS):
+        data = {"message": f"Turn on light number {number}.", "stream": True}
+        if conversation:
+            data["conversation_id"] = "living room"
+        await openai_service.chat_completion(service_call(**data))
+    first_token = openai_service.metrics.first_token
+    print(
+        f"prompt_cache {'on ' if prompt_cache else 'off'}"
+        f"{', conversation' if conversation else '              '}: "
+        f"first token p50 {first_token.percentile(50) * 1000:6.1f} ms, "
+        f"p95 {first_token.percentile(95) * 1000:6.1f} ms, "
+        f"{(server.evaluated_tokens - evaluated) / CALLS:5.0f} prompt tokens evaluated per call"
+    )
+    await openai_service.async_close()
+
+
+async def main() -> None:
+    """Compare the time to the first token with and without prompt caching."""
+    server = StubServer(prompt_latency=PROMPT_LATENCY, keep_requests=0)
+    await server.start()
+    hass = create_hass()
+    for prompt_cache, conversation in ((False, False), (True, False), (True, True)):
+        await run(server, hass, prompt_cache, conversation)
+    await server.stop()
+    await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
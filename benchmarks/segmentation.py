@@ -0,0 +1,92 @@
+"""
+Measure sentence segmentation throughput for english, german and
+mixed-language replies.
+
+Compares building a new pysbd `Segmenter` for every call (the behaviour
+before segmenters were cached) with `ChatService.segment_text`, which reuses
+one segmenter per language and thread.
+
+Also checks that segmenting from several threads at once, as the executor
+does for overlapping responses, returns the same sentences as segmenting
+one text after another.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/segmentation.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import sys
+import timeit
+
+from pysbd import Segmenter
+
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+REPLIES = {
+    "en": (
+        "The average distance from the Moon to Earth is about 238,900 miles. "
+        "This measurement varies because the Moon's orbit is not a perfect circle. "
+        "Dr. Smith measured it in 1969! Did you know that?"
+    ),
+    "de": (
+        "Wann es dunkel wird, hängt vom Standort und der Jahreszeit ab. "
+        "In Deutschland beginnt die Nacht im Sommer um ca. 21 Uhr. "
+        "Die genaue Zeit variiert je nach Breitengrad und Saison."
+    ),
+    "mixed": (
+        "Die genaue Zeit variiert je nach Breitengrad und Saison. "
+        "In english: When will it be dark? "
+        "Hier kannst du deinen Ort eingeben. That should help!"
+    ),
+}
+ROUNDS = 500
+THREADS = 4
+THREADED_CALLS = 2000
+
+
+def segment_rebuilding(text: str, language: str) -> list:
+    """Segment with a new `Segmenter` per call."""
+    return Segmenter(language=language, clean=False).segment(text)
+
+
+def check_threads() -> int:
+    """Segment distinct replies from several threads and return the number of
+    results that differ from segmenting them one after another."""
+    replies = [
+        (f"{text} Reply number {number}.", "de" if name == "mixed" else name)
+        for number in range(THREADED_CALLS // len(REPLIES))
+        for name, text in REPLIES.items()
+    ]
+    expected = [ChatService.segment_text(text, language) for text, language in replies]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(THREADS) as executor:
+            results = list(
+                executor.map(lambda reply: ChatService.segment_text(*reply), replies)
+            )
+    finally:
+        sys.setswitchinterval(switch_interval)
+    mismatches = sum(result != sentences for result, sentences in zip(results, expected))
+    print(f"{len(replies)} segmentations in {THREADS} threads: {mismatches} wrong")
+    return mismatches
+
+
+def main() -> int:
+    """Print segmented sentences per second for both strategies and
+    return the number of wrong threaded segmentations."""
+    for name, text in REPLIES.items():
+        language = ChatService.identify_language(text)[0]
+        sentences = len(ChatService.segment_text(text, language))
+        for strategy, func in (
+            ("rebuilding", segment_rebuilding),
+            ("cached", ChatService.segment_text),
+        ):
+            seconds = timeit.timeit(lambda f=func: f(text, language), number=ROUNDS)
+            print(
+                f"{name:>6} {strategy:>11}: {ROUNDS * sentences / seconds:10.0f} sentences/s"
+            )
+    return check_threads()
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,121 @@
+"""
+Compare the language of every sentence classified on its own with
+`ChatService.language_per_sentence`, which lets short fragments take the
+language of their neighbours, leans towards the language of the whole reply
+and memoises repeated short sentences.
+
+Replies are built from the labelled corpus, a few sentences of one language
+with short fragments like "OK." in between, plus one sentence of the other
+language in every third reply to check that real switches survive.
+
+Run from the repository root:
+    PYTHONPATH=. python benchmarks/sentence_smoothing.py
+"""
+import itertools
+import timeit
+
+from language_corpus import SAMPLES
+
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+FRAGMENTS = {
+    "de": ("OK.", "Ja.", "21 °C.", "Danke!"),
+    "en": ("OK.", "Yes.", "70 °F.", "Thanks!"),
+}
+SENTENCES_PER_REPLY = 4
+ROUNDS = 20
+
+
+def build_replies() -> list:
+    """Returns replies as lists of (language, sentence) pairs."""
+    by_language = {
+        language: [text for lang, text in SAMPLES if lang == language]
+        for language in FRAGMENTS
+    }
+    replies = []
+    for language, other in (("de", "en"), ("en", "de")):
+        texts = itertools.cycle(by_language[language])
+        others = itertools.cycle(by_language[other])
+        fragments = itertools.cycle(FRAGMENTS[language])
+        for number in range(12):
+            reply = []
+            for _ in range(SENTENCES_PER_REPLY):
+                reply.append((language, next(texts)))
+                reply.append((language, next(fragments)))
+            if number % 3 == 0:
+                reply.insert(2, (other, next(others)))
+            replies.append(reply)
+    return replies
+
+
+def accuracy(replies: list, results: list) -> float:
+    """Returns the share of sentences classified as their labelled language."""
+    pairs = [
+        (language, result)
+        for reply, reply_results in zip(replies, results)
+        for (language, _), result in zip(reply, reply_results)
+    ]
+    return sum(language == result for language, result in pairs) / len(pairs)
+
+
+def main() -> None:
+    """Print accuracy, classifications per reply and time of both approaches."""
+    replies = build_replies()
+    sentence_count = sum(len(reply) for reply in replies)
+    for languages in (None, ("de", "en")):
+
+        def raw(languages=languages):
+            return [
+                [
+                    language
+                    for language, _ in ChatService.identify_languages(
+                        [text for _, text in reply], languages
+                    )
+                ]
+                for reply in replies
+            ]
+
+        def smoothed(languages=languages):
+            return [
+                [
+                    sentence["language"]
+                    for sentence in ChatService.language_per_sentence(
+                        [text for _, text in reply],
+                        languages,
+                        ChatService.identify_language(
+                            " ".join(text for _, text in reply), languages
+                        ),
+                    )
+                ]
+                for reply in replies
+            ]
+
+        ChatService._classifications.clear()
+        calls = 0
+        identify_languages = ChatService.identify_languages
+
+        def counting(texts, *args):
+            nonlocal calls
+            calls += len(texts)
+            return identify_languages(texts, *args)
+
+        ChatService.identify_languages = staticmethod(counting)
+        try:
+            smoothed_results = smoothed()
+        finally:
+            ChatService.identify_languages = staticmethod(identify_languages)
+        raw_time = timeit.timeit(raw, number=ROUNDS) / ROUNDS
+        smoothed_time = timeit.timeit(smoothed, number=ROUNDS) / ROUNDS
+        print(
+            f"{'all' if languages is None else '+'.join(languages):>6}: "
+            f"per sentence {accuracy(replies, raw()):6.1%} correct, "
+            f"{sentence_count / len(replies):4.1f} classified per reply, "
+            f"{raw_time * 1000:6.2f} ms | "
+            f"smoothed {accuracy(replies, smoothed_results):6.1%} correct, "
+            f"{calls / len(replies):4.1f} classified per reply, "
+            f"{smoothed_time * 1000:6.2f} ms (memoised)"
+        )
+
+
+if __name__ == "__main__":
+    main()
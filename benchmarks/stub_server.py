@@ -0,0 +1,201 @@
+"""
+A local stub of the OpenAI compatible `/v1/chat/completions` API.
+
+The stub echoes the last user message back, optionally after a delay and
+optionally as a server-sent event stream, so that the integration can be
+driven without network access or a real model. Errors can be injected to
+exercise retries and the circuit breaker. With `prompt_latency` set, the
+stub also takes time to evaluate the prompt and, like llama.cpp with
+`cache_prompt`, only evaluates what follows the prefix it evaluated last.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import json
+import random
+import time
+
+from aiohttp import web
+
+
+class StubServer:
+    """An OpenAI compatible chat completion endpoint on localhost."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        chunk_size: int = 8,
+        keep_requests: int | None = None,
+        prompt_latency: float = 0.0,
+        report_usage: bool = True,
+    ):
+        """Initialize the stub.
+
+        Args:
+            latency (float, optional): Seconds to wait before answering.
+            jitter (float, optional): Random extra seconds added to the latency.
+            chunk_size (int, optional): Characters per chunk when streaming.
+            keep_requests (int | None, optional): Number of received payloads kept
+                in `requests`. Defaults to all of them.
+            prompt_latency (float, optional): Seconds to evaluate one prompt token.
+            report_usage (bool, optional): Include the token `usage` in responses.
+
+        Set `error_rate` to fail a random share of requests with `error_status`.
+        `connections` collects the client addresses of all requests, which
+        shows whether connections are reused. `evaluated_tokens` counts the
+        prompt tokens that were evaluated rather than reused.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.requests: deque[dict] = deque(maxlen=keep_requests)
+        self.received = 0
+        self.connections: set[tuple] = set()
+        self.prompt_latency = prompt_latency
+        self.report_usage = report_usage
+        self.evaluated_tokens = 0
+        self._slots: dict[int, list[str]] = {}
+        self.error_status = 503
+        self.error_retry_after: float | None = None
+        self.error_rate = 0.0
+        self._errors_left = 0
+        self._runner: web.AppRunner | None = None
+        self.port = 0
+
+    @property
+    def url(self) -> str:
+        """Returns the base URL to configure as custom endpoint."""
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def start(self):
+        """Start listening on a free local port."""
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._completions)
+        app.router.add_get("/v1/models", self._models)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+
+    async def stop(self):
+        """Stop the stub."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def fail_next(self, count: int, status: int = 503, retry_after: float | None = None):
+        """Answer the next `count` requests with an error.
+
+        Args:
+            count (int): Number of requests to fail.
+            status (int, optional): HTTP status code to answer with.
+            retry_after (float | None, optional): Value of the `Retry-After` header.
+        """
+        self._errors_left = count
+        self.error_status = status
+        self.error_retry_after = retry_after
+
+    @staticmethod
+    def reply_for(payload: dict) -> str:
+        """Returns the text the stub answers for a chat completion payload."""
+        return f"You said: {payload['messages'][-1]['content']}"
+
+    def evaluate_prompt(self, payload: dict) -> int:
+        """Returns the number of prompt tokens that need to be evaluated.
+        With `cache_prompt` the tokens the slot evaluated last are reused up to
+        the first difference.
+        """
+        tokens = [
+            token
+            for message in payload["messages"]
+            for token in [f"<{message['role']}>", *message["content"].split()]
+        ]
+        slot = max(payload.get("id_slot", 0), 0)
+        reused = 0
+        if payload.get("cache_prompt"):
+            for cached, token in zip(self._slots.get(slot, []), tokens):
+                if cached != token:
+                    break
+                reused += 1
+        self._slots[slot] = tokens
+        self.evaluated_tokens += len(tokens) - reused
+        return len(tokens) - reused
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.requests.append(payload)
+        self.received += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        await asyncio.sleep(
+            self.latency
+            + random.uniform(0, self.jitter)
+            + self.evaluate_prompt(payload) * self.prompt_latency
+        )
+        if self._errors_left > 0 or random.random() < self.error_rate:
+            self._errors_left = max(0, self._errors_left - 1)
+            headers = {}
+            if self.error_retry_after is not None:
+                headers["Retry-After"] = str(self.error_retry_after)
+            return web.json_response(
+                {"error": {"message": "injected error", "type": "server_error"}},
+                status=self.error_status,
+                headers=headers,
+            )
+        text = StubServer.reply_for(payload)
+        usage = {
+            "prompt_tokens": sum(len(m["content"].split()) for m in payload["messages"]),
+            "completion_tokens": len(text.split()),
+            "total_tokens": 0,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if payload.get("stream"):
+            return await self._stream(request, text, usage)
+        return web.json_response(
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "stub"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage if self.report_usage else None,
+            }
+        )
+
+    async def _stream(self, request: web.Request, text: str, usage: dict) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        chunks = [
+            {"delta": {"content": text[i:i + self.chunk_size]}, "finish_reason": None}
+            for i in range(0, len(text), self.chunk_size)
+        ]
+        chunks.append({"delta": {}, "finish_reason": "stop"})
+        for chunk in chunks:
+            event = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": "stub",
+                "choices": [{"index": 0, **chunk}],
+            }
+            if chunk["finish_reason"] is not None and self.report_usage:
+                event["usage"] = usage
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await asyncio.sleep(0)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def _models(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [{"id": "stub", "object": "model", "created": 0, "owned_by": "stub"}],
+            }
+        )
@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import logging
-from openai import OpenAI, AsyncOpenAI
 import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
@@ -14,12 +13,21 @@ from homeassistant.core import (
     SupportsResponse,
     callback,
 )
+from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.start import async_at_started
 from .integrations.openai_service import OpenAIService
-from .const import DEFAULT_MAX_TOKENS, DEFAULT_MOOD, DEFAULT_TEMPERATURE, DOMAIN
+from .integrations.persistent_cache import PersistentResponseCache
+from .integrations.usage import UsageTally
+from .const import (
+    ANALYSIS_LEVELS,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MOOD,
+    DEFAULT_TEMPERATURE,
+    DOMAIN,
+)
 
-# PLATFORMS: list[Platform] = [Platform.SENSOR]
-PLATFORMS: list[Platform] = []
+PLATFORMS: list[Platform] = [Platform.SENSOR]
 _LOGGER = logging.getLogger(__name__)
 CHAT_ITEMS_SERVICE_NAME = "send_request"
 CHAT_ITEMS_SCHEMA = vol.Schema(
@@ -28,6 +36,36 @@ CHAT_ITEMS_SCHEMA = vol.Schema(
         vol.Optional("mood"): cv.string,
         vol.Optional("temperature"): cv.positive_float,
         vol.Optional("max_tokens"): cv.positive_int,
+        vol.Optional("stream", default=False): cv.boolean,
+        vol.Optional("bypass_cache", default=False): cv.boolean,
+        vol.Optional("conversation_id"): cv.string,
+        vol.Optional("priority", default="normal"): vol.In(["high", "normal", "low"]),
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Optional("analysis"): vol.In(ANALYSIS_LEVELS),
+    }
+)
+BATCH_SERVICE_NAME = "send_batch"
+BATCH_ITEM_SCHEMA = vol.Schema(
+    {
+        vol.Required("message"): cv.string,
+        vol.Optional("mood"): cv.string,
+        vol.Optional("temperature"): cv.positive_float,
+        vol.Optional("max_tokens"): cv.positive_int,
+    }
+)
+BATCH_SCHEMA = vol.Schema(
+    {
+        vol.Required("items"): vol.All(
+            cv.ensure_list, [BATCH_ITEM_SCHEMA], vol.Length(min=1)
+        ),
+        vol.Optional("mood"): cv.string,
+        vol.Optional("temperature"): cv.positive_float,
+        vol.Optional("max_tokens"): cv.positive_int,
+        vol.Optional("bypass_cache", default=False): cv.boolean,
+        vol.Optional("priority", default="normal"): vol.In(["high", "normal", "low"]),
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Optional("analysis"): vol.In(ANALYSIS_LEVELS),
+        vol.Optional("parallelism"): cv.positive_int,
     }
 )
 
@@ -37,23 +75,37 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     _LOGGER.debug("OpenAI Service Config data %s", str(entry))
 
-    # if entry.data.get("endpoint_type") == "openai":
-    #     client = OpenAI(api_key=entry.data.get("api_key"))
-    #     #client = AsyncOpenAI(api_key=entry.data.get("api_key"))
-    # elif entry.data.get("endpoint_type") == "custom":
-    #     client = OpenAI(base_url=entry.data.get("url"), api_key="nokey")
-    #     #client = AsyncOpenAI(base_url=entry.data.get("url"), api_key="nokey")
-    # hass.data[DOMAIN][entry.entry_id] = client
     # Register Options update listener
     entry.async_on_unload(entry.add_update_listener(update_listener))
-    openai_service = OpenAIService(entry)
+    openai_service = OpenAIService(hass, entry)
+    # The service, its pooled API client and cache live as long as the config entry.
+    hass.data[DOMAIN][entry.entry_id] = openai_service
+    # Only the index of the persistent cache is read here, responses are read on use.
+    await openai_service.persistent_cache.async_load()
+    await openai_service.usage.async_load()
+    entry.async_on_unload(openai_service.usage.async_track_midnight())
+
+    @callback
+    def target_service(call: ServiceCall) -> OpenAIService:
+        """Returns the service of the entry the call is addressed to."""
+        if (entry_id := call.data.get("config_entry_id")) is None:
+            return openai_service
+        if (target := hass.data[DOMAIN].get(entry_id)) is None:
+            raise HomeAssistantError(f"OpenAI Service entry {entry_id} is not loaded")
+        return target
 
     @callback
     async def chat_completion(call: ServiceCall) -> ServiceResponse:
         """Run chat completion."""
         _LOGGER.debug("OpenAI Service Received data %s", str(call.data))
         _LOGGER.debug("OpenAI Service Entry data %s", str(entry.data))
-        return await openai_service.chat_completion(call)
+        return await target_service(call).chat_completion(call)
+
+    @callback
+    async def batch_completion(call: ServiceCall) -> ServiceResponse:
+        """Run chat completion for a batch of messages."""
+        _LOGGER.debug("OpenAI Service Received batch %s", str(call.data))
+        return await target_service(call).batch_completion(call)
 
     # Register our service with Home Assistant.
     hass.services.async_register(
@@ -63,21 +115,48 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         schema=CHAT_ITEMS_SCHEMA,
         supports_response=SupportsResponse.ONLY,
     )
+    hass.services.async_register(
+        DOMAIN,
+        BATCH_SERVICE_NAME,
+        batch_completion,
+        schema=BATCH_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    async def warm_up(hass: HomeAssistant) -> None:
+        """Load the API client, analysis libraries and tokenizer in the executor."""
+        await hass.async_add_executor_job(OpenAIService.warm_up, openai_service.languages)
+        await hass.async_add_executor_job(openai_service.tokens.load)
 
-    #    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    # The heavy libraries are loaded lazily, so they stay off the startup path.
+    entry.async_on_unload(async_at_started(hass, warm_up))
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        openai_service = hass.data[DOMAIN].pop(entry.entry_id)
+        await openai_service.persistent_cache.async_flush()
+        await openai_service.usage.async_flush()
+        await openai_service.async_close()
 
     # Remove options update_listener.
     # entry_data["unsub_update_listener"]()
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the persistent cache and usage tally of a removed config entry."""
+    await PersistentResponseCache(hass, entry.entry_id, 0, 0).async_remove()
+    await UsageTally(hass, entry.entry_id, 0, 0).async_remove()
+
+
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Handle options update."""
+    """Handle options update.
+    Reloading the entry closes the current API client and builds a new one
+    with the updated options.
+    """
     await hass.config_entries.async_reload(entry.entry_id)
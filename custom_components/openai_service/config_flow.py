@@ -1,10 +1,10 @@
 """Config flow for OpenAI Service integration."""
 from __future__ import annotations
 
+from functools import partial
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from openai import APIConnectionError, AuthenticationError, OpenAI
 import voluptuous as vol
 
 from homeassistant import config_entries
@@ -13,21 +13,95 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.exceptions import HomeAssistantError
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.selector import (
+    SelectOptionDict,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+)
 
+from .integrations.openai_service import OpenAIService
 from .const import (
+    ANALYSIS_LEVELS,
+    CONTEXT_OVERFLOW_MODES,
+    RATE_LIMIT_MODES,
+    CONF_ANALYSIS,
+    CONF_ANALYSIS_WORKERS,
+    CONF_BATCH_PARALLELISM,
+    CONF_BREAKER_RESET,
+    CONF_BREAKER_THRESHOLD,
+    CONF_CACHE_SIZE,
+    CONF_CACHE_TTL,
+    CONF_COMPLETION_PRICE,
+    CONF_CONTEXT_OVERFLOW,
+    CONF_CONTEXT_SIZE,
+    CONF_CONVERSATION_TTL,
+    CONF_FALLBACK_ENTRY,
+    CONF_HEDGE_AFTER,
+    CONF_KEEPALIVE_EXPIRY,
+    CONF_LANGUAGES,
+    CONF_MAX_IN_FLIGHT,
+    CONF_MAX_QUEUED,
+    CONF_MAX_RETRIES,
     CONF_MAX_TOKENS,
     CONF_MODEL,
     CONF_MOOD,
+    CONF_PERSISTENT_CACHE_SIZE,
+    CONF_PERSISTENT_CACHE_TTL,
+    CONF_POOL_SIZE,
+    CONF_PROMPT_CACHE,
+    CONF_PROMPT_CACHE_SLOT,
+    CONF_PROMPT_PRICE,
+    CONF_QUEUE_TIMEOUT,
+    CONF_RATE_LIMIT_MODE,
+    CONF_REQUESTS_PER_MINUTE,
+    CONF_RETRY_DELAY,
     CONF_TEMPERATURE,
+    CONF_TOKENS_PER_MINUTE,
+    CONF_VALIDATION_TIMEOUT,
+    DEFAULT_ANALYSIS,
+    DEFAULT_ANALYSIS_WORKERS,
+    DEFAULT_BATCH_PARALLELISM,
+    DEFAULT_BREAKER_RESET,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_COMPLETION_PRICE,
+    DEFAULT_CONTEXT_OVERFLOW,
+    DEFAULT_CONTEXT_SIZE,
+    DEFAULT_CONVERSATION_TTL,
+    DEFAULT_FALLBACK_ENTRY,
+    DEFAULT_HEDGE_AFTER,
+    DEFAULT_KEEPALIVE_EXPIRY,
+    DEFAULT_LANGUAGES,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_QUEUED,
+    DEFAULT_MAX_RETRIES,
     DEFAULT_MAX_TOKENS,
     DEFAULT_MODEL,
     DEFAULT_MOOD,
     DEFAULT_NAME,
+    DEFAULT_PERSISTENT_CACHE_SIZE,
+    DEFAULT_PERSISTENT_CACHE_TTL,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_PROMPT_CACHE,
+    DEFAULT_PROMPT_CACHE_SLOT,
+    DEFAULT_PROMPT_PRICE,
+    DEFAULT_QUEUE_TIMEOUT,
+    DEFAULT_RATE_LIMIT_MODE,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_RETRY_DELAY,
     DEFAULT_TEMPERATURE,
+    DEFAULT_TOKENS_PER_MINUTE,
     DEFAULT_URL,
+    DEFAULT_VALIDATION_TIMEOUT,
     DOMAIN,
+    LANGID_LANGUAGES,
 )
 
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 _LOGGER = logging.getLogger(__name__)
 
 OPENAI_SCHEMA = vol.Schema(
@@ -35,6 +109,9 @@ OPENAI_SCHEMA = vol.Schema(
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
         vol.Required(CONF_API_KEY): cv.string,
         vol.Optional(CONF_MODEL, default=DEFAULT_MODEL): cv.string,
+        vol.Optional(
+            CONF_VALIDATION_TIMEOUT, default=DEFAULT_VALIDATION_TIMEOUT
+        ): cv.positive_float,
     }
 )
 
@@ -43,6 +120,9 @@ CUSTOM_LLM_SCHEMA = vol.Schema(
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
         vol.Required(CONF_URL, default=DEFAULT_URL): cv.string,
         vol.Optional(CONF_MODEL, default=DEFAULT_MODEL): cv.string,
+        vol.Optional(
+            CONF_VALIDATION_TIMEOUT, default=DEFAULT_VALIDATION_TIMEOUT
+        ): cv.positive_float,
     }
 )
 
@@ -50,18 +130,30 @@ CUSTOM_LLM_SCHEMA = vol.Schema(
 class ConnectionHub:
     """Connection class to verify OpenAI connection."""
 
-    def __init__(self, client: OpenAI) -> None:
+    def __init__(self, client: AsyncOpenAI, model: str) -> None:
         """Initialize."""
         self.client = client
+        self.model = model
 
     async def authenticate(self) -> bool:
-        """Test if we can authenticate with the API endpoint."""
+        """Test if we can authenticate with the API endpoint.
+
+        Listing the models is free and supported by most endpoints. Endpoints
+        without a models route are probed with a single token completion.
+        """
+        # Imported here, Home Assistant loads the config flow at startup.
+        # pylint: disable-next=import-outside-toplevel
+        from openai import APIConnectionError, AuthenticationError, NotFoundError
+
         try:
-            self.client.chat.completions.create(
-                model=DEFAULT_MODEL,
-                messages=[{"role": "system", "content": "Say this is a test."}],
-                max_tokens=5,
-            )
+            try:
+                await self.client.models.list()
+            except NotFoundError:
+                await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "system", "content": "Say this is a test."}],
+                    max_tokens=1,
+                )
         except APIConnectionError as exc:
             raise CannotConnect from exc
         except AuthenticationError as exc:
@@ -79,14 +171,23 @@ async def validate_input(
     Data has the keys from OPENAI_SCHEMA or
     CUSTOM_LLM_SCHEMA with values provided by the user.
     """
-    if endpoint == "openai":
-        client = OpenAI(api_key=data.get("api_key"))
-    elif endpoint == "custom":
-        client = OpenAI(base_url=data.get("url"), api_key="nokey")
-
-    hub = ConnectionHub(client)
-    if not await hub.authenticate():
-        raise InvalidAuth
+    # The first client imports openai and httpx, which takes too long for the event loop.
+    client = await hass.async_add_executor_job(
+        partial(
+            OpenAIService.build_client,
+            endpoint,
+            data.get("api_key", "no-key"),
+            data.get("url"),
+            timeout=data.get(CONF_VALIDATION_TIMEOUT, DEFAULT_VALIDATION_TIMEOUT),
+            max_retries=0,
+        )
+    )
+    try:
+        hub = ConnectionHub(client, data.get(CONF_MODEL, DEFAULT_MODEL))
+        if not await hub.authenticate():
+            raise InvalidAuth
+    finally:
+        await client.close()
 
     # Return info that you want to store in the config entry.
     return {"endpoint_type": endpoint}
@@ -186,6 +287,15 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
         # Retrieve the options associated with the config entry
         options = self.config_entry.options or {}
+        # Any other entry can serve as fallback endpoint.
+        fallback_entries = [SelectOptionDict(value="", label="-")] + [
+            SelectOptionDict(
+                value=entry.entry_id,
+                label=f"{entry.title} ({entry.data.get('endpoint_type', 'custom')})",
+            )
+            for entry in self.hass.config_entries.async_entries(DOMAIN)
+            if entry.entry_id != self.config_entry.entry_id
+        ]
         if user_input is not None:
             # Value of data will be set on the options property of our config_entry
             # instance.
@@ -210,6 +320,169 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                         CONF_MAX_TOKENS,
                         default=options.get("max_tokens", DEFAULT_MAX_TOKENS),
                     ): cv.positive_int,
+                    vol.Optional(
+                        CONF_ANALYSIS,
+                        default=options.get("analysis", DEFAULT_ANALYSIS),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=ANALYSIS_LEVELS,
+                            mode=SelectSelectorMode.DROPDOWN,
+                            translation_key="analysis",
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_ANALYSIS_WORKERS,
+                        default=options.get(
+                            "analysis_workers", DEFAULT_ANALYSIS_WORKERS
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_BATCH_PARALLELISM,
+                        default=options.get(
+                            "batch_parallelism", DEFAULT_BATCH_PARALLELISM
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_POOL_SIZE,
+                        default=options.get("pool_size", DEFAULT_POOL_SIZE),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_KEEPALIVE_EXPIRY,
+                        default=options.get(
+                            "keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY
+                        ),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_MAX_IN_FLIGHT,
+                        default=options.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_MAX_QUEUED,
+                        default=options.get("max_queued", DEFAULT_MAX_QUEUED),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_QUEUE_TIMEOUT,
+                        default=options.get("queue_timeout", DEFAULT_QUEUE_TIMEOUT),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_MAX_RETRIES,
+                        default=options.get("max_retries", DEFAULT_MAX_RETRIES),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_RETRY_DELAY,
+                        default=options.get("retry_delay", DEFAULT_RETRY_DELAY),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_BREAKER_THRESHOLD,
+                        default=options.get(
+                            "breaker_threshold", DEFAULT_BREAKER_THRESHOLD
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_BREAKER_RESET,
+                        default=options.get("breaker_reset", DEFAULT_BREAKER_RESET),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_REQUESTS_PER_MINUTE,
+                        default=options.get(
+                            "requests_per_minute", DEFAULT_REQUESTS_PER_MINUTE
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_TOKENS_PER_MINUTE,
+                        default=options.get("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_RATE_LIMIT_MODE,
+                        default=options.get("rate_limit_mode", DEFAULT_RATE_LIMIT_MODE),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=RATE_LIMIT_MODES,
+                            mode=SelectSelectorMode.DROPDOWN,
+                            translation_key="rate_limit_mode",
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_PROMPT_PRICE,
+                        default=options.get("prompt_price", DEFAULT_PROMPT_PRICE),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_COMPLETION_PRICE,
+                        default=options.get("completion_price", DEFAULT_COMPLETION_PRICE),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_FALLBACK_ENTRY,
+                        default=options.get("fallback_entry", DEFAULT_FALLBACK_ENTRY),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=fallback_entries,
+                            mode=SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_HEDGE_AFTER,
+                        default=options.get("hedge_after", DEFAULT_HEDGE_AFTER),
+                    ): cv.positive_float,
+                    vol.Optional(
+                        CONF_CACHE_TTL,
+                        default=options.get("cache_ttl", DEFAULT_CACHE_TTL),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_CACHE_SIZE,
+                        default=options.get("cache_size", DEFAULT_CACHE_SIZE),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_PERSISTENT_CACHE_TTL,
+                        default=options.get(
+                            "persistent_cache_ttl", DEFAULT_PERSISTENT_CACHE_TTL
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_PERSISTENT_CACHE_SIZE,
+                        default=options.get(
+                            "persistent_cache_size", DEFAULT_PERSISTENT_CACHE_SIZE
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_CONTEXT_SIZE,
+                        default=options.get("context_size", DEFAULT_CONTEXT_SIZE),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_CONTEXT_OVERFLOW,
+                        default=options.get("context_overflow", DEFAULT_CONTEXT_OVERFLOW),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=CONTEXT_OVERFLOW_MODES,
+                            mode=SelectSelectorMode.DROPDOWN,
+                            translation_key="context_overflow",
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_CONVERSATION_TTL,
+                        default=options.get(
+                            "conversation_ttl", DEFAULT_CONVERSATION_TTL
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_PROMPT_CACHE,
+                        default=options.get("prompt_cache", DEFAULT_PROMPT_CACHE),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_PROMPT_CACHE_SLOT,
+                        default=options.get(
+                            "prompt_cache_slot", DEFAULT_PROMPT_CACHE_SLOT
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=-1)),
+                    vol.Optional(
+                        CONF_LANGUAGES,
+                        default=options.get("languages", DEFAULT_LANGUAGES),
+                    ): SelectSelector(
+                        SelectSelectorConfig(
+                            options=LANGID_LANGUAGES,
+                            multiple=True,
+                            mode=SelectSelectorMode.DROPDOWN,
+                        )
+                    ),
                 }
             ),
         )
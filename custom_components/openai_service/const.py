@@ -1,18 +1,115 @@
 """Constants for the OpenAI Service integration."""
 DOMAIN = "openai_service"
 
+"""Events fired by this service"""
+EVENT_SENTENCE = f"{DOMAIN}_sentence"
+
 """Custom config parameters for this service"""
 CONF_MODEL = "model"
 CONF_MOOD = "mood"
 CONF_TEMPERATURE = "temperature"
 CONF_MAX_TOKENS = "max_tokens"
+CONF_ANALYSIS_WORKERS = "analysis_workers"
+CONF_POOL_SIZE = "pool_size"
+CONF_KEEPALIVE_EXPIRY = "keepalive_expiry"
+CONF_CACHE_TTL = "cache_ttl"
+CONF_CACHE_SIZE = "cache_size"
+CONF_PERSISTENT_CACHE_TTL = "persistent_cache_ttl"
+CONF_PERSISTENT_CACHE_SIZE = "persistent_cache_size"
+CONF_LANGUAGES = "languages"
+CONF_VALIDATION_TIMEOUT = "validation_timeout"
+CONF_CONTEXT_SIZE = "context_size"
+CONF_CONTEXT_OVERFLOW = "context_overflow"
+CONF_PROMPT_CACHE = "prompt_cache"
+CONF_PROMPT_CACHE_SLOT = "prompt_cache_slot"
+CONF_REQUESTS_PER_MINUTE = "requests_per_minute"
+CONF_TOKENS_PER_MINUTE = "tokens_per_minute"
+CONF_RATE_LIMIT_MODE = "rate_limit_mode"
+CONF_PROMPT_PRICE = "prompt_price"
+CONF_COMPLETION_PRICE = "completion_price"
+CONF_CONVERSATION_TTL = "conversation_ttl"
+CONF_MAX_IN_FLIGHT = "max_in_flight"
+CONF_MAX_QUEUED = "max_queued"
+CONF_QUEUE_TIMEOUT = "queue_timeout"
+CONF_MAX_RETRIES = "max_retries"
+CONF_RETRY_DELAY = "retry_delay"
+CONF_BREAKER_THRESHOLD = "breaker_threshold"
+CONF_BREAKER_RESET = "breaker_reset"
+CONF_FALLBACK_ENTRY = "fallback_entry"
+CONF_HEDGE_AFTER = "hedge_after"
+CONF_ANALYSIS = "analysis"
+CONF_BATCH_PARALLELISM = "batch_parallelism"
 
 """Default Config values"""
 DEFAULT_NAME = "hassio_openai_service"
 DEFAULT_MODEL = "gpt-3.5-turbo-instruct"
 DEFAULT_URL = "http://localhost:1234/v1"
+DEFAULT_VALIDATION_TIMEOUT = 10
 
 """Default Option values"""
 DEFAULT_MOOD = "Your answers are short but precise."
 DEFAULT_TEMPERATURE = 0.7
 DEFAULT_MAX_TOKENS = 300
+DEFAULT_ANALYSIS_WORKERS = 2
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30
+DEFAULT_CACHE_TTL = 0
+DEFAULT_CACHE_SIZE = 100
+DEFAULT_PERSISTENT_CACHE_TTL = 604800
+DEFAULT_PERSISTENT_CACHE_SIZE = 0
+DEFAULT_LANGUAGES: list[str] = []
+DEFAULT_CONTEXT_SIZE = 4096
+DEFAULT_CONTEXT_OVERFLOW = "clamp"
+DEFAULT_PROMPT_CACHE = False
+DEFAULT_PROMPT_CACHE_SLOT = -1
+DEFAULT_REQUESTS_PER_MINUTE = 0
+DEFAULT_TOKENS_PER_MINUTE = 0
+DEFAULT_RATE_LIMIT_MODE = "queue"
+DEFAULT_PROMPT_PRICE = 0
+DEFAULT_COMPLETION_PRICE = 0
+DEFAULT_CONVERSATION_TTL = 600
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_QUEUED = 20
+DEFAULT_QUEUE_TIMEOUT = 30
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_DELAY = 1
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 30
+DEFAULT_FALLBACK_ENTRY = ""
+DEFAULT_HEDGE_AFTER = 0
+DEFAULT_ANALYSIS = "full"
+DEFAULT_BATCH_PARALLELISM = 4
+
+"""Levels of response analysis, each one includes the previous ones"""
+ANALYSIS_LEVELS = ["none", "language", "sentences", "full"]
+
+"""What to do with requests whose answer doesn't fit into the context window"""
+CONTEXT_OVERFLOW_MODES = ["clamp", "reject"]
+
+"""What to do with requests over the rate limit"""
+RATE_LIMIT_MODES = ["queue", "reject"]
+
+"""List prices of OpenAI models in USD per million prompt and completion tokens"""
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.5, 1.5),
+    "gpt-3.5-turbo-instruct": (1.5, 2.0),
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-32k": (60.0, 120.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4-0125-preview": (10.0, 30.0),
+    "gpt-4-1106-preview": (10.0, 30.0),
+    "gpt-4o": (5.0, 15.0),
+    "gpt-4o-mini": (0.15, 0.6),
+}
+
+"""Languages known to the langid model"""
+LANGID_LANGUAGES = [
+    "af", "am", "an", "ar", "as", "az", "be", "bg", "bn", "br", "bs", "ca", "cs",
+    "cy", "da", "de", "dz", "el", "en", "eo", "es", "et", "eu", "fa", "fi", "fo",
+    "fr", "ga", "gl", "gu", "he", "hi", "hr", "ht", "hu", "hy", "id", "is", "it",
+    "ja", "jv", "ka", "kk", "km", "kn", "ko", "ku", "ky", "la", "lb", "lo", "lt",
+    "lv", "mg", "mk", "ml", "mn", "mr", "ms", "mt", "nb", "ne", "nl", "nn", "no",
+    "oc", "or", "pa", "pl", "ps", "pt", "qu", "ro", "ru", "rw", "se", "si", "sk",
+    "sl", "sq", "sr", "sv", "sw", "ta", "te", "th", "tl", "tr", "ug", "uk", "ur",
+    "vi", "vo", "wa", "xh", "zh", "zu",
+]
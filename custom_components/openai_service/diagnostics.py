@@ -0,0 +1,35 @@
+"""Diagnostics support for the OpenAI Service integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_API_KEY
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_API_KEY}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    openai_service = hass.data[DOMAIN][entry.entry_id]
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "cache": openai_service.cache.stats,
+        "persistent_cache": openai_service.persistent_cache.stats,
+        "conversations": openai_service.conversations.stats,
+        "coalescing": openai_service.coalescing_stats,
+        "scheduler": openai_service.scheduler.stats,
+        "retries": openai_service.retry_policy.stats,
+        "circuit_breaker": openai_service.breaker.stats,
+        "fallback": openai_service.fallback_stats,
+        "metrics": openai_service.metrics.stats,
+        "tokens": openai_service.tokens.stats,
+        "rate_limit": openai_service.rate_limiter.stats,
+        "usage": openai_service.usage.stats,
+    }
@@ -1,12 +1,63 @@
 """
 The abstract base class from which the integrations inherit their structure and base functions.
+
+numpy, pysbd and langid are imported on first use, or by `warm_up` after
+Home Assistant has started, to keep them off the startup path.
 """
+from __future__ import annotations
+
+import asyncio
 from abc import ABC, abstractmethod
-from pysbd import Segmenter
-from langid.langid import LanguageIdentifier, model
+from collections import OrderedDict
+import copy
+import logging
+from threading import Lock, local
+import time
+from typing import TYPE_CHECKING
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import ServiceCall, ServiceResponse
-from ..const import DEFAULT_MAX_TOKENS, DEFAULT_MOOD, DEFAULT_TEMPERATURE
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
+from .conversation import ConversationMemory
+from .metrics import ServiceMetrics
+from .persistent_cache import PersistentResponseCache
+from .response_cache import ResponseCache
+from .scheduler import RequestScheduler
+from .tokens import TokenEstimator
+from ..const import (
+    ANALYSIS_LEVELS,
+    DEFAULT_ANALYSIS,
+    DEFAULT_ANALYSIS_WORKERS,
+    DEFAULT_BATCH_PARALLELISM,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_CACHE_TTL,
+    DEFAULT_CONTEXT_OVERFLOW,
+    DEFAULT_CONTEXT_SIZE,
+    DEFAULT_CONVERSATION_TTL,
+    DEFAULT_LANGUAGES,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_QUEUED,
+    DEFAULT_MAX_TOKENS,
+    DEFAULT_MOOD,
+    DEFAULT_PERSISTENT_CACHE_SIZE,
+    DEFAULT_PERSISTENT_CACHE_TTL,
+    DEFAULT_PROMPT_CACHE,
+    DEFAULT_PROMPT_CACHE_SLOT,
+    DEFAULT_QUEUE_TIMEOUT,
+    DEFAULT_TEMPERATURE,
+)
+if TYPE_CHECKING:
+    from langid.langid import LanguageIdentifier
+    from pysbd import Segmenter
+
+_LOGGER = logging.getLogger(__name__)
+SEGMENTER_CACHE_SIZE = 8
+FALLBACK_SEGMENTER_LANGUAGE = "en"
+# Sentences with fewer letters, like "OK." or "21°C.", take the language of a neighbour.
+FRAGMENT_LETTERS = 8
+# How much more likely the language of the whole text is for each of its sentences.
+PRIOR_WEIGHT = 4.0
+# Classifications of sentences up to this length are memoised.
+MEMO_MAX_LENGTH = 80
+MEMO_SIZE = 512
 
 class ChatService(ABC):
     """The abstract base class to base chat integrations upon.
@@ -14,21 +65,67 @@ class ChatService(ABC):
     Args:
         ABC (_type_): Define class as an abstract base class by inheriting from `ABC`.
     """
-    def __init__(self, entry: ConfigEntry):
+    _identifiers: dict[tuple | None, LanguageIdentifier] = {}
+    _identifier_lock = Lock()
+    _classifications: OrderedDict[tuple, tuple] = OrderedDict()
+    _classification_lock = Lock()
+    _segmenters = local()
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         """Initialize class and derive parameters from entry object.
 
         Args:
+            hass (HomeAssistant): The Home Assistant instance.
             entry (ConfigEntry): A Home Assistant `ConfigEntry` object.
         """
+        self.hass = hass
         self.entry = entry
         self.endpoint_type = entry.data.get("endpoint_type", "custom")
-        self.response = None
-        self.model = entry.options.get("model", "no-model")
+        # The config flow stores the model in the entry data.
+        self.model = entry.options.get("model", entry.data.get("model", "no-model"))
         self.api_key = entry.data.get("api_key", "no-key")
         self.base_url = entry.data.get("url")
         self.max_tokens = entry.options.get("max_tokens", DEFAULT_MAX_TOKENS)
         self.mood = entry.options.get("mood", DEFAULT_MOOD)
         self.temperature = entry.options.get("temperature", DEFAULT_TEMPERATURE)
+        self.analysis_workers = entry.options.get(
+            "analysis_workers", DEFAULT_ANALYSIS_WORKERS
+        )
+        self._analysis_slots = asyncio.Semaphore(self.analysis_workers)
+        self.languages = entry.options.get("languages", DEFAULT_LANGUAGES)
+        self.analysis = entry.options.get("analysis", DEFAULT_ANALYSIS)
+        self.batch_parallelism = int(
+            entry.options.get("batch_parallelism", DEFAULT_BATCH_PARALLELISM)
+        )
+        self.conversations = ConversationMemory(
+            entry.options.get("conversation_ttl", DEFAULT_CONVERSATION_TTL),
+            entry.options.get("context_size", DEFAULT_CONTEXT_SIZE),
+        )
+        self.prompt_cache = bool(entry.options.get("prompt_cache", DEFAULT_PROMPT_CACHE))
+        self.prompt_cache_slot = int(
+            entry.options.get("prompt_cache_slot", DEFAULT_PROMPT_CACHE_SLOT)
+        )
+        self.tokens = TokenEstimator(
+            self.model,
+            entry.options.get("context_size", DEFAULT_CONTEXT_SIZE),
+            entry.options.get("context_overflow", DEFAULT_CONTEXT_OVERFLOW),
+        )
+        self.scheduler = RequestScheduler(
+            entry.options.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT),
+            entry.options.get("max_queued", DEFAULT_MAX_QUEUED),
+            entry.options.get("queue_timeout", DEFAULT_QUEUE_TIMEOUT),
+        )
+        self.cache = ResponseCache(
+            entry.options.get("cache_ttl", DEFAULT_CACHE_TTL),
+            entry.options.get("cache_size", DEFAULT_CACHE_SIZE),
+        )
+        self.persistent_cache = PersistentResponseCache(
+            hass,
+            entry.entry_id,
+            entry.options.get("persistent_cache_ttl", DEFAULT_PERSISTENT_CACHE_TTL),
+            entry.options.get("persistent_cache_size", DEFAULT_PERSISTENT_CACHE_SIZE),
+        )
+        self.metrics = ServiceMetrics()
 
     @property
     def entry(self):
@@ -48,24 +145,6 @@ class ChatService(ABC):
         """
         self._entry = entry_obj
 
-    @property
-    def response(self) -> str:
-        """Returns the response text string that was returned from a chat completion.
-
-        Returns:
-            str: Chat completion response text.
-        """
-        return self._response
-
-    @response.setter
-    def response(self, text: str):
-        """Set the response text that was returned by a chat completion call.
-
-        Args:
-            text (str): Chat completion response text.
-        """
-        self._response = text
-
     @property
     def endpoint_type(self) -> str:
         """Returns the endpoint type.
@@ -215,6 +294,77 @@ class ChatService(ABC):
         """
         self._temperature = float(temp_float)
 
+    @property
+    def analysis_workers(self) -> int:
+        """Returns how many response analysis jobs may run in the executor at once.
+
+        Returns:
+            int: Maximum number of concurrent response analysis jobs.
+        """
+        return self._analysis_workers
+
+    @analysis_workers.setter
+    def analysis_workers(self, workers: int):
+        """Sets how many response analysis jobs may run in the executor at once.
+
+        Args:
+            workers (int): Maximum number of concurrent response analysis jobs.
+        """
+        self._analysis_workers = max(1, int(workers))
+
+    @property
+    def languages(self) -> tuple | None:
+        """Returns the languages the language identification is restricted to.
+
+        Returns:
+            tuple | None: Sorted 2-letter language codes or `None` for all languages.
+        """
+        return self._languages
+
+    @languages.setter
+    def languages(self, codes: list):
+        """Restricts language identification to the given languages.
+        An empty list allows all languages known to langid.
+
+        Args:
+            codes (list): 2-letter language codes.
+        """
+        self._languages = tuple(sorted(set(codes))) if codes else None
+
+    @property
+    def analysis(self) -> str:
+        """Returns the default level of response analysis.
+
+        Returns:
+            str: `none`, `language`, `sentences` or `full`.
+        """
+        return self._analysis
+
+    @analysis.setter
+    def analysis(self, level: str):
+        """Set the default level of response analysis.
+        Unknown levels fall back to `full`.
+
+        Args:
+            level (str): `none`, `language`, `sentences` or `full`.
+        """
+        self._analysis = level if level in ANALYSIS_LEVELS else DEFAULT_ANALYSIS
+
+    def analysis_level(self, call: ServiceCall) -> str:
+        """Returns the level of analysis for a service call.
+        Streamed responses are always analysed fully, because their sentence
+        events are replayed from the response for cached and joined requests.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+
+        Returns:
+            str: `none`, `language`, `sentences` or `full`.
+        """
+        if call.data.get("stream", False):
+            return "full"
+        return call.data.get("analysis", self.analysis)
+
     @abstractmethod
     async def chat_completion(self, call: ServiceCall) -> ServiceResponse:
         """Responsible for driving the chat completion with the given input parameters.
@@ -225,61 +375,303 @@ class ChatService(ABC):
         Returns:
             ServiceResponse: A dictionary holding the response and other information.
         """
-        self.response= "This is a hard-coded test response from the OpenAI Service integration."
-        return self.prepare_response()
+        text = "This is a hard-coded test response from the OpenAI Service integration."
+        return self.prepare_response(text, self.languages)
+
+    async def batch_completion(self, call: ServiceCall) -> ServiceResponse:
+        """Runs the chat completion for every item of a `send_batch` call.
+        At most `parallelism` items are processed at the same time, and an item
+        that fails only fails its own result.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object with the
+                list of `items` and the settings they share.
+
+        Returns:
+            ServiceResponse: The `responses` in the order of the items. Each one is
+            either the result of `chat_completion` or a dictionary with the `error`.
+        """
+        shared = {
+            key: value
+            for key, value in call.data.items()
+            if key not in ("items", "parallelism")
+        }
+        slots = asyncio.Semaphore(call.data.get("parallelism", self.batch_parallelism))
+
+        async def run(item: dict) -> dict:
+            item_call = copy.copy(call)
+            item_call.data = {**shared, **item}
+            async with slots:
+                try:
+                    return await self.chat_completion(item_call)
+                except Exception as exc:  # pylint: disable=broad-except
+                    _LOGGER.warning("OpenAI Service batch item failed: %s", exc)
+                    return {"error": str(exc)}
+
+        return {"responses": await asyncio.gather(*(run(item) for item in call.data["items"]))}
+
+    async def async_prepare_response(
+        self, text: str, analysis: str = DEFAULT_ANALYSIS
+    ) -> dict:
+        """Runs `prepare_response` in the executor so that language identification
+        and sentence segmentation don't block the Home Assistant event loop.
+        The number of concurrent jobs is limited by `analysis_workers`.
+
+        Args:
+            text (str): Chat completion response text.
+            analysis (str, optional): The level of analysis. Defaults to `full`.
+
+        Returns:
+            dict: The result of `prepare_response`.
+        """
+        if analysis == "none":
+            return ChatService.prepare_response(text, analysis=analysis)
+        async with self._analysis_slots:
+            started = time.perf_counter()
+            service_response, analysis_time = await self.hass.async_add_executor_job(
+                ChatService._timed_prepare_response, text, self.languages, analysis
+            )
+        self.metrics.record_analysis(analysis_time)
+        _LOGGER.debug(
+            "Response analysis took %.1f ms off the event loop (%.1f ms until done)",
+            analysis_time * 1000,
+            (time.perf_counter() - started) * 1000,
+        )
+        return service_response
+
+    @staticmethod
+    def _timed_prepare_response(
+        text: str, languages: tuple | None = None, analysis: str = DEFAULT_ANALYSIS
+    ) -> tuple[dict, float]:
+        """Runs `prepare_response` and measures how long it took.
+
+        Args:
+            text (str): Chat completion response text.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+            analysis (str, optional): The level of analysis. Defaults to `full`.
+
+        Returns:
+            tuple: The result of `prepare_response` and the duration in seconds.
+        """
+        started = time.perf_counter()
+        service_response = ChatService.prepare_response(text, languages, analysis)
+        return service_response, time.perf_counter() - started
 
-    def prepare_response(self) -> dict:
+    @staticmethod
+    def prepare_response(
+        text: str, languages: tuple | None = None, analysis: str = DEFAULT_ANALYSIS
+    ) -> dict:
         """Prepares and returns the response of the chat completion.
+        Everything is derived from `text`, so concurrent calls can't
+        interfere with each other. Stages beyond `analysis` are skipped.
+
+        Args:
+            text (str): Chat completion response text.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+            analysis (str, optional): The level of analysis. `none` only returns
+                the response, `language` adds its language, `sentences` the list
+                of sentences and `full` the language of every sentence.
+                Defaults to `full`.
 
         Returns:
             dict: Containing the response, it's language and confidence and 
             a list of each sentence, again with language and confidence per sentence.
         """
-        overall_lang_guess = ChatService.identify_language(self.response)
-        sentences = ChatService.segment_text(self.response, overall_lang_guess[0])
-        sentences_classified = ChatService.language_per_sentence(sentences)
-        return {
-            "response": self.response,
+        if analysis == "none":
+            return {"response": text}
+        overall_lang_guess = ChatService.identify_language(text, languages)
+        service_response = {
+            "response": text,
             "language": overall_lang_guess[0],
             "confidence": overall_lang_guess[1],
-            "sentences": sentences_classified
         }
+        if analysis == "language":
+            return service_response
+        sentences = ChatService.segment_text(text, overall_lang_guess[0])
+        if analysis == "sentences":
+            service_response["sentences"] = [{"text": s} for s in sentences]
+        else:
+            service_response["sentences"] = ChatService.language_per_sentence(
+                sentences, languages, overall_lang_guess
+            )
+        return service_response
 
     @staticmethod
-    def language_per_sentence(sentences: list) -> list:
+    def language_per_sentence(
+        sentences: list, languages: tuple | None = None, prior: tuple | None = None
+    ) -> list:
         """Process a list of sentences and identify the language of each sentence.
+        Fragments with fewer than `FRAGMENT_LETTERS` letters are too short to
+        classify reliably and take the language of the sentence before them,
+        the one after them at the start, or else the `prior`.
 
         Args:
             sentences (list): The list of strings for which we try to identify the language.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+            prior (tuple | None, optional): Language and confidence of the whole
+                text. Sentences lean towards its language, see `classify_sentences`.
 
         Returns:
             list: A list of dictionaries where each entry contains the 
             original `text`, the discovered language and the confidence.
         """
-        sentences_classified = []
-        for s in sentences:
-            language = ChatService.identify_language(s)
-            sentences_classified.append(
-                {
-                    "text": s,
-                    "language": language[0],
-                    "confidence": language[1]
-                }
+        classify = [
+            index
+            for index, sentence in enumerate(sentences)
+            if sum(char.isalpha() for char in sentence) >= FRAGMENT_LETTERS
+        ]
+        if not classify and prior is None:
+            classify = list(range(len(sentences)))
+        guesses = dict(
+            zip(
+                classify,
+                ChatService.classify_sentences(
+                    [sentences[index] for index in classify],
+                    languages,
+                    None if prior is None else prior[0],
+                ),
+            )
+        )
+        following = None if not classify else guesses[classify[0]]
+        previous = None
+        results = []
+        for index, sentence in enumerate(sentences):
+            previous = guesses.get(index, previous)
+            language = previous or following or prior
+            results.append(
+                {"text": sentence, "language": language[0], "confidence": language[1]}
             )
-        return sentences_classified
+        return results
 
     @staticmethod
-    def identify_language(text: str) -> tuple:
+    def classify_sentences(
+        sentences: list, languages: tuple | None = None, prior: str | None = None
+    ) -> list:
+        """Identifies the language of several sentences. Short sentences repeat
+        often ("Alles klar."), so their classifications are memoised.
+
+        Args:
+            sentences (list): The strings to find the language for.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+            prior (str | None, optional): The language of the whole text, see
+                `identify_languages`.
+
+        Returns:
+            list: A tuple of 2-letter country code and confidence level per sentence.
+        """
+        results: list[tuple | None] = [None] * len(sentences)
+        with ChatService._classification_lock:
+            for index, sentence in enumerate(sentences):
+                key = (sentence, languages, prior)
+                if len(sentence) <= MEMO_MAX_LENGTH and key in ChatService._classifications:
+                    ChatService._classifications.move_to_end(key)
+                    results[index] = ChatService._classifications[key]
+        missing = [index for index, result in enumerate(results) if result is None]
+        guesses = ChatService.identify_languages(
+            [sentences[index] for index in missing], languages, prior
+        )
+        with ChatService._classification_lock:
+            for index, guess in zip(missing, guesses):
+                results[index] = guess
+                if len(sentences[index]) <= MEMO_MAX_LENGTH:
+                    ChatService._classifications[(sentences[index], languages, prior)] = guess
+            while len(ChatService._classifications) > MEMO_SIZE:
+                ChatService._classifications.popitem(last=False)
+        return results
+
+    @staticmethod
+    def identify_language(text: str, languages: tuple | None = None) -> tuple:
         """Takes a string and tries to identify the language of the text.
 
         Args:
             text (str): The text to find the language for.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
 
         Returns:
             tuple: A tuple of: 2-letter country code and the confidence level.
         """
-        identifier = LanguageIdentifier.from_modelstring(model, norm_probs=True)
-        return identifier.classify(text)
+        return ChatService.get_identifier(languages).classify(text)
+
+    @staticmethod
+    def identify_languages(
+        texts: list, languages: tuple | None = None, prior: str | None = None
+    ) -> list:
+        """Identifies the language of several strings at once.
+        The feature vectors of all strings are scored against the langid model
+        in a single matrix operation. Without a `prior` the results are the
+        same as calling `identify_language` for every string.
+
+        Args:
+            texts (list): The strings to find the language for.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+            prior (str | None, optional): A language assumed `PRIOR_WEIGHT` times
+                as likely as the others, usually the language of the whole text.
+                Only strings that clearly are in another language get another one.
+
+        Returns:
+            list: A tuple of 2-letter country code and confidence level per string.
+        """
+        import numpy as np  # pylint: disable=import-outside-toplevel
+
+        if not texts:
+            return []
+        identifier = ChatService.get_identifier(languages)
+        features = np.array([identifier.instance2fv(text) for text in texts])
+        log_probs = np.dot(features, identifier.nb_ptc) + identifier.nb_pc
+        # Same normalisation as langid's `norm_probs`, applied row by row.
+        with np.errstate(over="ignore"):
+            probs = 1 / np.exp(log_probs[:, None, :] - log_probs[:, :, None]).sum(2)
+        if prior is not None and prior in identifier.nb_classes:
+            probs[:, list(identifier.nb_classes).index(prior)] *= PRIOR_WEIGHT
+            probs /= probs.sum(axis=1, keepdims=True)
+        best = probs.argmax(axis=1)
+        return [
+            (str(identifier.nb_classes[cl]), float(probs[row, cl]))
+            for row, cl in enumerate(best)
+        ]
+
+    @staticmethod
+    def get_identifier(languages: tuple | None = None) -> LanguageIdentifier:
+        """Returns the shared langid `LanguageIdentifier` instance for a language set.
+        The embedded model is decoded only once, on first use, and then
+        kept for the lifetime of the integration. Identifiers restricted to
+        a subset of languages are derived from it and cached as well.
+
+        Args:
+            languages (tuple | None, optional): Sorted 2-letter language codes
+                to restrict classification to. Defaults to all languages.
+
+        Returns:
+            LanguageIdentifier: The process-wide language identifier.
+        """
+        from langid.langid import LanguageIdentifier, model  # pylint: disable=import-outside-toplevel
+
+        with ChatService._identifier_lock:
+            if None not in ChatService._identifiers:
+                ChatService._identifiers[None] = LanguageIdentifier.from_modelstring(
+                    model, norm_probs=True
+                )
+            if languages not in ChatService._identifiers:
+                identifier = copy.copy(ChatService._identifiers[None])
+                identifier.set_languages(languages)
+                ChatService._identifiers[languages] = identifier
+        return ChatService._identifiers[languages]
+
+    @staticmethod
+    def warm_up(languages: tuple | None = None):
+        """Imports the analysis libraries and prepares the language identifier
+        and the english segmenter, so that the first response doesn't have to.
+        Blocking, run it in the executor.
+
+        Args:
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+        """
+        started = time.perf_counter()
+        ChatService.prepare_response("Warm up.", languages)
+        _LOGGER.debug(
+            "Response analysis warmed up in %.0f ms",
+            (time.perf_counter() - started) * 1000,
+        )
 
     @staticmethod
     def segment_text(text: str, language: str = "en") -> list:
@@ -292,8 +684,66 @@ class ChatService(ABC):
         Returns:
             list: A list of strings where each sentence represents an item in the list.
         """
-        seg = Segmenter(language=language, clean=False)
-        return seg.segment(text)
+        return ChatService.get_segmenter(language).segment(text)
+
+    @staticmethod
+    def get_segmenter(language: str) -> Segmenter:
+        """Returns a cached pysbd `Segmenter` for the given language.
+        Languages that pysbd does not support fall back to the english segmenter.
+        A `Segmenter` keeps the text it works on in its attributes, so every
+        thread, e.g. of the executor, gets its own segmenters.
+
+        Args:
+            language (str): A 2-char country code.
+
+        Returns:
+            Segmenter: The sentence segmenter for the language.
+        """
+        from pysbd import Segmenter  # pylint: disable=import-outside-toplevel
+        from pysbd.languages import LANGUAGE_CODES  # pylint: disable=import-outside-toplevel
+
+        segmenters = getattr(ChatService._segmenters, "cache", None)
+        if segmenters is None:
+            segmenters = ChatService._segmenters.cache = OrderedDict()
+        if language in segmenters:
+            segmenters.move_to_end(language)
+            return segmenters[language]
+        if language not in LANGUAGE_CODES:
+            segmenter = ChatService.get_segmenter(FALLBACK_SEGMENTER_LANGUAGE)
+        else:
+            segmenter = Segmenter(language=language, clean=False)
+        segmenters[language] = segmenter
+        if len(segmenters) > SEGMENTER_CACHE_SIZE:
+            segmenters.popitem(last=False)
+        return segmenter
+
+    @staticmethod
+    def split_completed_sentences(
+        text: str, final: bool = False, languages: tuple | None = None
+    ) -> tuple[list, str]:
+        """Splits partial text, e.g. a streamed response, into the sentences that
+        are already complete and the trailing remainder that may still grow.
+
+        Args:
+            text (str): The text received so far.
+            final (bool, optional): The text is complete, return all sentences.
+                Defaults to False.
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+
+        Returns:
+            tuple: A list of classified sentences (see `language_per_sentence`)
+            and the remaining text that is not yet a complete sentence.
+        """
+        language = ChatService.identify_language(text, languages)
+        sentences = ChatService.segment_text(text, language[0])
+        if final:
+            return ChatService.language_per_sentence(sentences, languages, language), ""
+        if len(sentences) < 2:
+            return [], text
+        return (
+            ChatService.language_per_sentence(sentences[:-1], languages, language),
+            sentences[-1],
+        )
 
     def build_messages_payload(self, call: ServiceCall) -> list:
         """Produces a list of dictionaries to be sent in
@@ -303,15 +753,19 @@ class ChatService(ABC):
             call (ServiceCall): The Home Assistant service call object
 
         Returns:
-            list: A list containing one dictionary to setup the chat completion.
+            list: A list of dictionaries to setup the chat completion. Earlier turns
+            of the conversation are included if a `conversation_id` is given.
+            They follow the system message, so that requests with the same mood
+            start with the same prefix.
         """
-        return [
-            {
-                "role": "system",
-                "content": call.data.get(
-                    "mood",
-                    self.mood
-                ),
-            },
-            {"role": "user", "content": call.data.get("message")},
-        ]
+        system = [{"role": "system", "content": call.data.get("mood", self.mood)}]
+        user = {"role": "user", "content": call.data.get("message")}
+        if (conversation_id := call.data.get("conversation_id")) is None:
+            return [*system, user]
+        budget = (
+            self.conversations.context_size
+            - call.data.get("max_tokens", self.max_tokens)
+            - self.tokens.estimate([*system, user])
+        )
+        history = self.conversations.history(conversation_id, budget, self.tokens)
+        return [*system, *history, user]
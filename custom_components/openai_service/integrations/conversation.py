@@ -0,0 +1,95 @@
+"""
+Bounded, token-aware memory of multi-turn conversations.
+"""
+from __future__ import annotations
+
+from collections import deque
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .tokens import TokenEstimator
+
+MAX_TURNS = 20
+
+
+class ConversationMemory:
+    """Keeps the recent turns of every conversation in a ring buffer.
+    Idle conversations are dropped after `ttl` seconds.
+    """
+    def __init__(self, ttl: float, context_size: int):
+        """Initialize the memory.
+
+        Args:
+            ttl (float): Seconds after which an idle conversation is forgotten.
+            context_size (int): Context window of the model in tokens.
+        """
+        self.ttl = float(ttl)
+        self.context_size = int(context_size)
+        self._conversations: dict[str, tuple[float, deque]] = {}
+
+    @property
+    def stats(self) -> dict:
+        """Returns the memory statistics.
+
+        Returns:
+            dict: Number of conversations and turns that are kept.
+        """
+        self._evict_idle()
+        return {
+            "conversations": len(self._conversations),
+            "turns": sum(len(turns) for _, turns in self._conversations.values()),
+            "ttl": self.ttl,
+            "context_size": self.context_size,
+        }
+
+    def history(self, conversation_id: str, budget: int, tokens: TokenEstimator) -> list:
+        """Returns the earlier messages of a conversation that fit into `budget`.
+        The oldest turns are left out until the history fits. They are kept
+        in the memory for later requests with more room.
+
+        Args:
+            conversation_id (str): The conversation.
+            budget (int): Tokens available for the history.
+            tokens (TokenEstimator): Counts the messages the way the prompt is
+                checked against the context window.
+
+        Returns:
+            list: The messages to send before the new user message.
+        """
+        self._evict_idle()
+        if conversation_id not in self._conversations:
+            return []
+        _, turns = self._conversations[conversation_id]
+        messages: list = []
+        # Turns are stored as question and answer pairs, the newest last.
+        for question, answer in reversed(list(zip(*[iter(turns)] * 2))):
+            budget -= tokens.count_message(question) + tokens.count_message(answer)
+            if budget < 0:
+                break
+            messages[:0] = [question, answer]
+        return messages
+
+    def append(self, conversation_id: str, message: str, response: str):
+        """Adds a question and its answer to a conversation.
+
+        Args:
+            conversation_id (str): The conversation.
+            message (str): The user message.
+            response (str): The assistant response.
+        """
+        self._evict_idle()
+        _, turns = self._conversations.get(
+            conversation_id, (0, deque(maxlen=MAX_TURNS * 2))
+        )
+        turns.append({"role": "user", "content": message})
+        turns.append({"role": "assistant", "content": response})
+        self._conversations[conversation_id] = (time.monotonic() + self.ttl, turns)
+
+    def _evict_idle(self):
+        """Drops conversations that have been idle for longer than the TTL."""
+        now = time.monotonic()
+        for conversation_id in [
+            cid for cid, (expires, _) in self._conversations.items() if expires < now
+        ]:
+            del self._conversations[conversation_id]
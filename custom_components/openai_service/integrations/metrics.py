@@ -0,0 +1,169 @@
+"""
+Request counters and rolling latency statistics of an endpoint.
+"""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable
+import math
+
+WINDOW_SIZE = 100
+
+
+class RollingWindow:
+    """Keeps the last `size` samples of a measurement.
+    Older samples are dropped, so memory stays constant.
+    """
+    def __init__(self, size: int = WINDOW_SIZE):
+        """Initialize the window.
+
+        Args:
+            size (int, optional): Number of samples to keep.
+        """
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, value: float):
+        """Adds a sample and drops the oldest one if the window is full.
+
+        Args:
+            value (float): The sample.
+        """
+        self._samples.append(float(value))
+
+    def percentile(self, percent: float) -> float | None:
+        """Returns a percentile of the samples in the window (nearest rank).
+
+        Args:
+            percent (float): The percentile, e.g. `50` for the median.
+
+        Returns:
+            float | None: The percentile or `None` if there are no samples yet.
+        """
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+
+class ServiceMetrics:
+    """Counts requests, errors and tokens of an endpoint and keeps rolling
+    windows of the request latency, the time to the first streamed token,
+    the time spent analysing responses and the error of the prompt token
+    estimate.
+    """
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        """Initialize the metrics.
+
+        Args:
+            window_size (int, optional): Number of samples per rolling window.
+        """
+        self.requests = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated_prompt_tokens = 0
+        self.latency = RollingWindow(window_size)
+        self.first_token = RollingWindow(window_size)
+        self.analysis = RollingWindow(window_size)
+        self.estimate_error = RollingWindow(window_size)
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def stats(self) -> dict:
+        """Returns the metrics.
+
+        Returns:
+            dict: Counters, the median and 95th percentile of every rolling
+            window of durations in milliseconds and of the estimate error in percent.
+        """
+        stats = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "estimated_prompt_tokens": self.estimated_prompt_tokens,
+        }
+        for name, window in (
+            ("latency", self.latency),
+            ("first_token", self.first_token),
+            ("analysis", self.analysis),
+        ):
+            for percent in (50, 95):
+                value = window.percentile(percent)
+                stats[f"{name}_p{percent}"] = None if value is None else value * 1000
+        for percent in (50, 95):
+            stats[f"estimate_error_p{percent}"] = self.estimate_error.percentile(percent)
+        return stats
+
+    def add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Registers a callback that is called whenever the metrics change.
+
+        Args:
+            update_callback (Callable): Called without arguments in the event loop.
+
+        Returns:
+            Callable: Removes the listener again.
+        """
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    def record_request(self, latency: float):
+        """Counts a successful request.
+
+        Args:
+            latency (float): Seconds until the complete response arrived.
+        """
+        self.requests += 1
+        self.latency.add(latency)
+        self._notify()
+
+    def record_error(self):
+        """Counts a failed request."""
+        self.requests += 1
+        self.errors += 1
+        self._notify()
+
+    def record_first_token(self, seconds: float):
+        """Records the time until the first token of a streamed response arrived.
+
+        Args:
+            seconds (float): Seconds since the request was sent.
+        """
+        self.first_token.add(seconds)
+
+    def record_analysis(self, seconds: float):
+        """Records the time it took to analyse a response.
+
+        Args:
+            seconds (float): Seconds spent on language identification and segmentation.
+        """
+        self.analysis.add(seconds)
+        self._notify()
+
+    def record_usage(self, usage, estimated_prompt_tokens: int | None = None):
+        """Adds the token usage reported by the endpoint and compares the
+        prompt tokens with the estimate made before the request was sent.
+
+        Args:
+            usage: The `usage` of a chat completion response. May be `None`.
+            estimated_prompt_tokens (int | None, optional): The estimated prompt tokens.
+        """
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+        if estimated_prompt_tokens is not None and prompt_tokens > 0:
+            self.estimated_prompt_tokens += estimated_prompt_tokens
+            self.estimate_error.add(
+                abs(estimated_prompt_tokens - prompt_tokens) / prompt_tokens * 100
+            )
+
+    def _notify(self):
+        """Calls the registered listeners."""
+        for update_callback in list(self._listeners):
+            update_callback()
@@ -1,12 +1,49 @@
 """
 The chat completion integration for the openai API.
+
+openai and httpx are imported when the client is first needed, or by
+`warm_up` after Home Assistant has started.
 """
+from __future__ import annotations
+
+import asyncio
+import copy
 import logging
-from openai import AsyncOpenAI
+import time
+from typing import TYPE_CHECKING
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import ServiceCall, ServiceResponse
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse
+from homeassistant.util.ssl import client_context
 from .chat_service import ChatService  # Adjusted import statement
+from .rate_limit import RateLimiter
+from .resilience import CircuitBreaker, RetryPolicy, StreamInterrupted
+from .response_cache import ResponseCache
+from .usage import UsageTally, model_prices
+from ..const import (
+    DEFAULT_ANALYSIS,
+    DEFAULT_BREAKER_RESET,
+    DEFAULT_BREAKER_THRESHOLD,
+    DEFAULT_COMPLETION_PRICE,
+    DEFAULT_FALLBACK_ENTRY,
+    DEFAULT_HEDGE_AFTER,
+    DEFAULT_KEEPALIVE_EXPIRY,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_PROMPT_PRICE,
+    DEFAULT_QUEUE_TIMEOUT,
+    DEFAULT_RATE_LIMIT_MODE,
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_RETRY_DELAY,
+    DEFAULT_TOKENS_PER_MINUTE,
+    DOMAIN,
+    EVENT_SENTENCE,
+)
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
 _LOGGER = logging.getLogger(__name__)
+SENTENCE_TERMINATORS = ".!?\n。！？"
 
 class OpenAIService(ChatService):
     """The OpenAI API chat completion integration.
@@ -14,15 +51,52 @@ class OpenAIService(ChatService):
     Args:
         ChatService (class): The chat completion abstract base class.
     """
-    def __init__(self, entry: ConfigEntry):
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry):
         """Initialize class and derive parameters from entry object.
 
         Args:
+            hass (HomeAssistant): The Home Assistant instance.
             entry (ConfigEntry): A Home Assistant `ConfigEntry` object.
         """
-        super().__init__(entry)  # Call the __init__ method of the base class
+        super().__init__(hass, entry)  # Call the __init__ method of the base class
         self.frequency_penalty = 0
         self.presence_penalty = 0.6
+        self.fallback_entry = entry.options.get("fallback_entry", DEFAULT_FALLBACK_ENTRY)
+        self.hedge_after = float(entry.options.get("hedge_after", DEFAULT_HEDGE_AFTER))
+        self.fallbacks = 0
+        self.hedged_requests = 0
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self.coalesced_requests = 0
+        self.pool_size = entry.options.get("pool_size", DEFAULT_POOL_SIZE)
+        self.keepalive_expiry = entry.options.get(
+            "keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY
+        )
+        self._client: AsyncOpenAI | None = None
+        self.retry_policy = RetryPolicy(
+            entry.options.get("max_retries", DEFAULT_MAX_RETRIES),
+            entry.options.get("retry_delay", DEFAULT_RETRY_DELAY),
+        )
+        self.breaker = CircuitBreaker(
+            entry.options.get("breaker_threshold", DEFAULT_BREAKER_THRESHOLD),
+            entry.options.get("breaker_reset", DEFAULT_BREAKER_RESET),
+        )
+        self.rate_limiter = RateLimiter(
+            entry.options.get("requests_per_minute", DEFAULT_REQUESTS_PER_MINUTE),
+            entry.options.get("tokens_per_minute", DEFAULT_TOKENS_PER_MINUTE),
+            entry.options.get("rate_limit_mode", DEFAULT_RATE_LIMIT_MODE),
+            entry.options.get("queue_timeout", DEFAULT_QUEUE_TIMEOUT),
+        )
+        # Local models are free unless prices are configured.
+        prompt_price, completion_price = (
+            model_prices(self.model) if self.endpoint_type == "openai" else (0.0, 0.0)
+        )
+        self.usage = UsageTally(
+            hass,
+            entry.entry_id,
+            entry.options.get("prompt_price", DEFAULT_PROMPT_PRICE) or prompt_price,
+            entry.options.get("completion_price", DEFAULT_COMPLETION_PRICE)
+            or completion_price,
+        )
         _LOGGER.debug("OpenAIService Entry data %s", str(entry.data))
 
     @property
@@ -67,6 +141,90 @@ class OpenAIService(ChatService):
         """
         self._presence_penalty = float(penalty)
 
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Returns the pooled API client, which is created on first use.
+
+        Returns:
+            AsyncOpenAI: The API client.
+        """
+        if self._client is None:
+            self._client = OpenAIService.build_client(
+                self.endpoint_type,
+                self.api_key,
+                self.base_url,
+                self.pool_size,
+                self.keepalive_expiry,
+                # Retries are handled by `retry_policy`.
+                max_retries=0,
+            )
+        return self._client
+
+    async def async_close(self):
+        """Closes the API client and its connections, if it was ever created."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    @staticmethod
+    def warm_up(languages: tuple | None = None):
+        """Imports the API client libraries and warms up the response analysis.
+        Blocking, run it in the executor.
+
+        Args:
+            languages (tuple | None, optional): Languages to consider. Defaults to all.
+        """
+        import openai  # pylint: disable=import-outside-toplevel,unused-import
+
+        ChatService.warm_up(languages)
+
+    @staticmethod
+    def build_client(
+        endpoint_type: str,
+        api_key: str,
+        base_url: str | None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        timeout: float | None = None,
+        max_retries: int = 2,
+    ) -> AsyncOpenAI:
+        """Creates a long-lived `AsyncOpenAI` client backed by a connection pool.
+        Idle connections are kept open for `keepalive_expiry` seconds so that
+        subsequent requests can skip the TCP and TLS handshakes.
+
+        Args:
+            endpoint_type (str): The endpoint type. Can be `custom` or `openai`.
+            api_key (str): The OpenAI API key.
+            base_url (str | None): Base URL of a custom endpoint.
+            pool_size (int, optional): Maximum number of pooled connections.
+            keepalive_expiry (float, optional): Seconds an idle connection is kept open.
+            timeout (float | None, optional): Request timeout in seconds.
+                Defaults to the timeout of the openai library.
+            max_retries (int, optional): How often the openai library retries
+                a failed request. Defaults to 2.
+
+        Returns:
+            AsyncOpenAI: The API client.
+        """
+        import httpx  # pylint: disable=import-outside-toplevel
+        from openai import AsyncOpenAI  # pylint: disable=import-outside-toplevel
+
+        http_client = httpx.AsyncClient(
+            verify=client_context(),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        client_options = {"max_retries": max_retries, "http_client": http_client}
+        if timeout is not None:
+            client_options["timeout"] = timeout
+        if endpoint_type == "openai":
+            return AsyncOpenAI(api_key=api_key, **client_options)
+        return AsyncOpenAI(base_url=base_url, api_key=api_key, **client_options)
+
     async def chat_completion(self, call: ServiceCall) -> ServiceResponse:
         """Responsible for driving the chat completion with the given input parameters.
 
@@ -77,35 +235,478 @@ class OpenAIService(ChatService):
             ServiceResponse: A dictionary holding the response and other information.
         """
         _LOGGER.debug("OpenAIService Service data %s", str(call.data))
-        if self.endpoint_type == "openai":
-            client = AsyncOpenAI(api_key=self.api_key)
-        elif self.endpoint_type == "custom":
-            client = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key)
-        async with client as client_instance:
-            response = await client_instance.chat.completions.create(
-                **self.build_completion_payload(call)
-            )
-        self.response = response.choices[0].message.content
-        service_response = self.prepare_response()
+        payload = self.build_completion_payload(call)
+        analysis = self.analysis_level(call)
+        cache_key = None
+        service_response = None
+        if (
+            self.cache.enabled or self.persistent_cache.enabled
+        ) and not call.data.get("bypass_cache", False):
+            cache_key = ResponseCache.key({**payload, "analysis": analysis})
+            service_response = await self.cached_response(cache_key)
+            if service_response is not None:
+                _LOGGER.debug("OpenAI Service cached Response: %s", str(service_response))
+                if call.data.get("stream", False):
+                    for index, sentence in enumerate(service_response["sentences"]):
+                        self.fire_sentence_event(call, index, sentence)
+                self.remember_turn(call, service_response)
+        if service_response is None:
+            service_response = await self.coalesced_completion(call, payload, analysis)
+            if cache_key is not None:
+                await self.cache_response(cache_key, service_response)
         _LOGGER.debug("OpenAI Service Response: %s", str(service_response))
         return service_response
 
-    def build_completion_payload(self, call) -> dict:
+    @property
+    def coalescing_stats(self) -> dict:
+        """Returns the request coalescing statistics.
+
+        Returns:
+            dict: Number of requests in flight and of duplicates that were
+            answered by a request already in flight.
+        """
+        return {
+            "in_flight": len(self._in_flight),
+            "coalesced": self.coalesced_requests,
+        }
+
+    async def cached_response(self, cache_key: str) -> dict | None:
+        """Looks a response up in the in-memory cache and then in the
+        persistent cache. Hits from the persistent cache are kept in memory too.
+
+        Args:
+            cache_key (str): The cache key of the request.
+
+        Returns:
+            dict | None: The cached response or `None`.
+        """
+        if self.cache.enabled and (service_response := self.cache.get(cache_key)) is not None:
+            return service_response
+        if not self.persistent_cache.enabled:
+            return None
+        service_response = await self.persistent_cache.async_get(cache_key)
+        if service_response is not None and self.cache.enabled:
+            self.cache.set(cache_key, service_response)
+        return service_response
+
+    async def cache_response(self, cache_key: str, service_response: dict):
+        """Stores a response in the enabled caches.
+
+        Args:
+            cache_key (str): The cache key of the request.
+            service_response (dict): The analysed response.
+        """
+        if self.cache.enabled:
+            self.cache.set(cache_key, service_response)
+        if self.persistent_cache.enabled:
+            await self.persistent_cache.async_set(cache_key, service_response)
+
+    async def coalesced_completion(
+        self, call: ServiceCall, payload: dict, analysis: str
+    ) -> dict:
+        """Runs the chat completion and analysis for `payload`. Concurrent calls
+        with an identical payload, level of analysis and conversation share a
+        single request to the endpoint, and its turn is added to the
+        conversation once.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings.
+            analysis (str): The level of analysis, see `prepare_response`.
+
+        Returns:
+            dict: The analysed response, see `prepare_response`.
+        """
+        key = ResponseCache.key(
+            {
+                **payload,
+                "analysis": analysis,
+                "conversation_id": call.data.get("conversation_id"),
+            }
+        )
+        if (task := self._in_flight.get(key)) is None:
+            task = self.hass.async_create_task(
+                self.remembered_completion(call, payload, analysis)
+            )
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self._in_flight[key] = task
+            # The request is shielded so that a cancelled caller doesn't
+            # cancel it for the other callers that are waiting for it.
+            return copy.deepcopy(await asyncio.shield(task))
+        self.coalesced_requests += 1
+        _LOGGER.debug("OpenAI Service joined a request already in flight")
+        service_response = copy.deepcopy(await asyncio.shield(task))
+        if call.data.get("stream", False):
+            for index, sentence in enumerate(service_response["sentences"]):
+                self.fire_sentence_event(call, index, sentence)
+        return service_response
+
+    async def remembered_completion(
+        self, call: ServiceCall, payload: dict, analysis: str
+    ) -> dict:
+        """Runs the chat completion, see `completion_with_fallback`, and adds
+        its turn to the conversation of the call.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings.
+            analysis (str): The level of analysis, see `prepare_response`.
+
+        Returns:
+            dict: The analysed response, see `prepare_response`.
+        """
+        service_response = await self.completion_with_fallback(call, payload, analysis)
+        self.remember_turn(call, service_response)
+        return service_response
+
+    def remember_turn(self, call: ServiceCall, service_response: dict):
+        """Adds the message of the call and its response to the conversation
+        of the call, if it has a `conversation_id`.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            service_response (dict): The analysed response.
+        """
+        if (conversation_id := call.data.get("conversation_id")) is not None:
+            self.conversations.append(
+                conversation_id, call.data["message"], service_response["response"]
+            )
+
+    @property
+    def fallback_stats(self) -> dict:
+        """Returns the fallback statistics.
+
+        Returns:
+            dict: The fallback entry, the hedging delay, how often the fallback
+            answered and how often it was started as hedged request.
+        """
+        return {
+            "fallback_entry": self.fallback_entry,
+            "hedge_after": self.hedge_after,
+            "fallbacks": self.fallbacks,
+            "hedged_requests": self.hedged_requests,
+        }
+
+    def fallback_service(self) -> OpenAIService | None:
+        """Returns the service of the fallback config entry, if one is configured
+        and loaded.
+
+        Returns:
+            OpenAIService | None: The fallback service.
+        """
+        if not self.fallback_entry or self.fallback_entry == self.entry.entry_id:
+            return None
+        return self.hass.data.get(DOMAIN, {}).get(self.fallback_entry)
+
+    async def completion_with_fallback(
+        self, call: ServiceCall, payload: dict, analysis: str
+    ) -> dict:
+        """Runs the chat completion on this endpoint and falls back to the
+        endpoint of the fallback entry if this one fails.
+        With `hedge_after` set, the fallback is also started when this endpoint
+        hasn't answered within `hedge_after` seconds, and the first answer wins.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings.
+            analysis (str): The level of analysis, see `prepare_response`.
+
+        Returns:
+            dict: The analysed response, see `prepare_response`.
+        """
+        if (fallback := self.fallback_service()) is None:
+            return await self.completion(call, payload, analysis)
+        # The fallback uses its own model and settings but the same messages,
+        # which it checks against its own context window once it is used.
+        fallback_payload = fallback.build_completion_payload(call, payload["messages"])
+        # Hedging a stream would announce the sentences of both responses.
+        if self.hedge_after <= 0 or call.data.get("stream", False):
+            try:
+                return await self.completion(call, payload, analysis)
+            except StreamInterrupted:
+                raise
+            except Exception as exc:  # pylint: disable=broad-except
+                return await self.fall_back(fallback, call, fallback_payload, analysis, exc)
+        primary = self.hass.async_create_task(self.completion(call, payload, analysis))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if primary in done:
+                if (exc := primary.exception()) is None:
+                    return primary.result()
+                # Failed before it was time to hedge, a plain fallback.
+                return await self.fall_back(fallback, call, fallback_payload, analysis, exc)
+            self.hedged_requests += 1
+            tasks.add(
+                self.hass.async_create_task(
+                    fallback.completion(call, fallback_payload, analysis)
+                )
+            )
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.fallbacks += 1
+                        return task.result()
+            raise primary.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fall_back(
+        self,
+        fallback: OpenAIService,
+        call: ServiceCall,
+        payload: dict,
+        analysis: str,
+        exc: Exception,
+    ) -> dict:
+        """Runs the chat completion on the fallback after this endpoint failed.
+
+        Args:
+            fallback (OpenAIService): The service of the fallback entry.
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings of the fallback.
+            analysis (str): The level of analysis, see `prepare_response`.
+            exc (Exception): The error of this endpoint.
+
+        Returns:
+            dict: The analysed response, see `prepare_response`.
+        """
+        _LOGGER.warning(
+            "OpenAI Service endpoint failed (%s), using fallback %s",
+            exc,
+            fallback.entry.title,
+        )
+        self.fallbacks += 1
+        return await fallback.completion(call, payload, analysis)
+
+    async def completion(
+        self, call: ServiceCall, payload: dict, analysis: str = DEFAULT_ANALYSIS
+    ) -> dict:
+        """Sends the chat completion request and analyses the response.
+        Failed requests are retried according to `retry_policy`, and no request
+        is sent while the circuit breaker is open. The outcome and latency are
+        recorded in `metrics`.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings.
+            analysis (str, optional): The level of analysis, see `prepare_response`.
+                Defaults to `full`.
+
+        Returns:
+            dict: The analysed response, see `prepare_response`.
+        """
+        # Requests that can't fit into the context window fail before they are sent.
+        payload = self.fit_to_context(payload)
+        started = time.perf_counter()
+        try:
+            self.breaker.check()
+            text = await self.retry_policy.run(
+                lambda: self.scheduled_request(call, payload)
+            )
+        except Exception as exc:
+            if RetryPolicy.retryable(exc):
+                self.breaker.record_failure()
+            self.metrics.record_error()
+            raise
+        self.breaker.record_success()
+        self.metrics.record_request(time.perf_counter() - started)
+        return await self.async_prepare_response(text, analysis)
+
+    async def scheduled_request(self, call: ServiceCall, payload: dict) -> str:
+        """Sends the chat completion request once the scheduler grants a slot.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings.
+
+        Returns:
+            str: The response text.
+        """
+        # Reserves the prompt and the longest answer, the unused tokens are refunded.
+        estimate = self.tokens.estimate(payload["messages"])
+        reserved = estimate + payload["max_tokens"]
+        await self.rate_limiter.acquire(reserved)
+        try:
+            async with self.scheduler.slot(call.data.get("priority", "normal")):
+                if call.data.get("stream", False):
+                    text, used = await self.stream_completion(call, payload)
+                else:
+                    response = await self.client.chat.completions.create(
+                        **payload, extra_body=self.extra_body()
+                    )
+                    used = self.record_usage(payload, response.usage)
+                    text = response.choices[0].message.content
+        except (Exception, asyncio.CancelledError):
+            # A failed or cancelled attempt is retried or falls back and reserves again.
+            self.rate_limiter.refund(reserved)
+            raise
+        if used is None:
+            # Endpoints that don't report the usage are charged the estimate.
+            used = estimate + self.tokens.count(text or "")
+        self.rate_limiter.refund(reserved - used)
+        return text
+
+    def record_usage(self, payload: dict, usage) -> int | None:
+        """Records the token usage of a response in the metrics and the daily tally.
+
+        Args:
+            payload (dict): The chat completion settings.
+            usage: The `usage` of a chat completion response. May be `None`.
+
+        Returns:
+            int | None: The prompt and completion tokens used, `None` without usage.
+        """
+        if usage is None:
+            return None
+        self.metrics.record_usage(usage, self.tokens.estimate(payload["messages"]))
+        self.usage.record(usage)
+        return (getattr(usage, "prompt_tokens", 0) or 0) + (
+            getattr(usage, "completion_tokens", 0) or 0
+        )
+
+    async def stream_completion(
+        self, call: ServiceCall, payload: dict
+    ) -> tuple[str, int | None]:
+        """Streams the chat completion and fires an `openai_service_sentence` event
+        for every sentence as soon as it is complete, so that e.g. TTS can start
+        speaking while the model is still generating.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            payload (dict): The chat completion settings.
+
+        Returns:
+            tuple[str, int | None]: The complete response text and the tokens
+            used, if the endpoint reported them.
+        """
+        import httpx  # pylint: disable=import-outside-toplevel
+        from openai import APIConnectionError, APIStatusError  # pylint: disable=import-outside-toplevel
+
+        text = ""
+        pending = ""
+        index = 0
+        used = None
+        started = time.perf_counter()
+        stream = await self.client.chat.completions.create(
+            **payload, stream=True, extra_body=self.extra_body(stream=True)
+        )
+        try:
+            async for chunk in stream:
+                chunk_used = self.record_usage(payload, getattr(chunk, "usage", None))
+                if chunk_used is not None:
+                    used = chunk_used
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta and not text:
+                    self.metrics.record_first_token(time.perf_counter() - started)
+                text += delta
+                pending += delta
+                if not any(char in delta for char in SENTENCE_TERMINATORS):
+                    continue
+                sentences, pending = await self.hass.async_add_executor_job(
+                    ChatService.split_completed_sentences, pending, False, self.languages
+                )
+                for sentence in sentences:
+                    self.fire_sentence_event(call, index, sentence)
+                    index += 1
+        except (APIConnectionError, APIStatusError, httpx.HTTPError) as exc:
+            if not text:
+                raise
+            # Retrying would repeat the sentences that were already announced.
+            raise StreamInterrupted("The streamed response broke off") from exc
+        if pending.strip():
+            sentences, _ = await self.hass.async_add_executor_job(
+                ChatService.split_completed_sentences, pending, True, self.languages
+            )
+            for sentence in sentences:
+                self.fire_sentence_event(call, index, sentence)
+                index += 1
+        return text, used
+
+    def extra_body(self, stream: bool = False) -> dict | None:
+        """Returns the endpoint specific fields sent along with the payload.
+
+        Args:
+            stream (bool, optional): Whether the response is streamed.
+
+        Returns:
+            dict | None: The extra fields or `None` if there are none.
+        """
+        extra_body = {}
+        if stream and self.endpoint_type == "openai":
+            # OpenAI only reports the token usage of streams when asked to.
+            extra_body["stream_options"] = {"include_usage": True}
+        if self.prompt_cache and self.endpoint_type == "custom":
+            # llama.cpp style servers keep the evaluated prompt of a slot and only
+            # evaluate what follows the common prefix. Others ignore the fields.
+            extra_body["cache_prompt"] = True
+            if self.prompt_cache_slot >= 0:
+                extra_body["id_slot"] = self.prompt_cache_slot
+        return extra_body or None
+
+    def fire_sentence_event(self, call: ServiceCall, index: int, sentence: dict):
+        """Fires an event for a single classified sentence of a streamed response.
+
+        Args:
+            call (ServiceCall): The Home Assistant service call object
+            index (int): Position of the sentence within the response.
+            sentence (dict): The sentence `text`, `language` and `confidence`.
+        """
+        self.hass.bus.async_fire(
+            EVENT_SENTENCE,
+            {
+                "entry_id": self.entry.entry_id,
+                "context_id": call.context.id,
+                "index": index,
+                **sentence,
+            },
+            context=call.context,
+        )
+
+    def build_completion_payload(self, call, messages: list | None = None) -> dict:
         """Returns a dictionary with OpenAI API specific properties.
            Used to run the chat completion.
 
         Args:
             call (ServiceCall): The Home Assistant service call object
+            messages (list | None, optional): The messages to send, e.g. those of
+                the endpoint this one is the fallback of. Defaults to the
+                messages of the call, see `build_messages_payload`.
 
         Returns:
             dict: OpenAI API specific chat completion settings.
         """
         return {
             "model": self.model,
-            "messages": self.build_messages_payload(call),
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
+            "messages": self.build_messages_payload(call) if messages is None else messages,
+            "temperature": call.data.get("temperature", self.temperature),
+            "max_tokens": call.data.get("max_tokens", self.max_tokens),
             "top_p": 1,
             "frequency_penalty": self.frequency_penalty,
             "presence_penalty": self.presence_penalty
         }
+
+    def fit_to_context(self, payload: dict) -> dict:
+        """Checks that the messages and the answer fit into the context window
+        of this endpoint, see `TokenEstimator.completion_budget`.
+
+        Args:
+            payload (dict): The chat completion settings.
+
+        Raises:
+            PromptTooLong: If the messages don't fit.
+
+        Returns:
+            dict: The payload, with `max_tokens` lowered if it had to be clamped.
+        """
+        max_tokens = self.tokens.completion_budget(payload["messages"], payload["max_tokens"])
+        if max_tokens == payload["max_tokens"]:
+            return payload
+        return {**payload, "max_tokens": max_tokens}
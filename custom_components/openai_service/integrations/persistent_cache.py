@@ -0,0 +1,236 @@
+"""
+A response cache in Home Assistant's `.storage` that survives restarts.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+import copy
+import time
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from ..const import DOMAIN
+
+STORAGE_VERSION = 1
+SHARDS = 16
+# Seconds changes are collected before they are written.
+SAVE_DELAY = 30
+
+
+class PersistentResponseCache:
+    """A LRU cache with a time-to-live for analysed chat completion responses,
+    stored with Home Assistant's `Store` helper.
+
+    Only the index of keys and expiry times is loaded at startup. The
+    responses are spread over `SHARDS` files, which are loaded the first time
+    one of their entries is needed. Writes are debounced by `SAVE_DELAY`
+    seconds, so a busy cache writes each file at most once per delay.
+    """
+    def __init__(self, hass: HomeAssistant, entry_id: str, ttl: float, max_entries: int):
+        """Initialize the cache.
+
+        Args:
+            hass (HomeAssistant): The Home Assistant instance.
+            entry_id (str): The config entry the cache belongs to.
+            ttl (float): Seconds an entry stays valid. `0` disables the cache.
+            max_entries (int): Maximum number of entries before the least
+            recently used entry is evicted. `0` disables the cache.
+        """
+        self.hass = hass
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self._index_store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.cache")
+        self._shard_stores = [
+            Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.cache_{shard:x}")
+            for shard in range(SHARDS)
+        ]
+        # Key -> expiry as a UNIX timestamp, least recently used first.
+        self._index: OrderedDict[str, float] = OrderedDict()
+        self._shards: dict[int, dict[str, dict]] = {}
+        self._loading = asyncio.Lock()
+        self._dirty: set[int] = set()
+        self._index_dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.loads = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Returns whether the cache is in use.
+
+        Returns:
+            bool: `True` if both TTL and maximum entries are set.
+        """
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def stats(self) -> dict:
+        """Returns the cache statistics.
+
+        Returns:
+            dict: Size, limits, loaded shards and hit, miss and eviction counters.
+        """
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "entries": len(self._index),
+            "loaded_shards": len(self._shards),
+            "shard_loads": self.loads,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def shard(key: str) -> int:
+        """Returns the shard an entry is stored in.
+
+        Args:
+            key (str): The cache key, a hex digest.
+
+        Returns:
+            int: The number of the shard.
+        """
+        return int(key[:2], 16) % SHARDS
+
+    async def async_load(self):
+        """Loads the index and drops expired entries from it."""
+        if not self.enabled:
+            return
+        data = await self._index_store.async_load() or {}
+        now = time.time()
+        self._index = OrderedDict(
+            (key, expires) for key, expires in data.get("entries", []) if expires > now
+        )
+        while len(self._index) > self.max_entries:
+            self._index.popitem(last=False)
+        if len(self._index) != len(data.get("entries", [])):
+            self._index_changed()
+
+    async def async_get(self, key: str) -> dict | None:
+        """Returns a copy of the cached response for `key`.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict | None: The cached response or `None` if missing or expired.
+        """
+        expires = self._index.get(key)
+        if expires is not None and expires < time.time():
+            self._remove(key)
+            self.evictions += 1
+            expires = None
+        response = None
+        if expires is not None:
+            response = (await self._async_shard(self.shard(key))).get(key)
+        if response is None or key not in self._index:
+            if response is None and key in self._index:
+                # The index was written but the shard was not.
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._index.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(response)
+
+    async def async_set(self, key: str, response: dict):
+        """Stores a response and evicts the least recently used entries
+        if the cache is full.
+
+        Args:
+            key (str): The cache key.
+            response (dict): The analysed response.
+        """
+        shard = self.shard(key)
+        entries = await self._async_shard(shard)
+        entries[key] = copy.deepcopy(response)
+        self._index[key] = time.time() + self.ttl
+        self._index.move_to_end(key)
+        self._shard_changed(shard)
+        self._index_changed()
+        while len(self._index) > self.max_entries:
+            self._remove(next(iter(self._index)))
+            self.evictions += 1
+
+    async def async_flush(self):
+        """Writes pending changes right away, e.g. before the entry is unloaded."""
+        for shard in sorted(self._dirty):
+            await self._shard_stores[shard].async_save(self._shard_data(shard))
+        if self._index_dirty:
+            await self._index_store.async_save(self._index_data())
+
+    async def async_remove(self):
+        """Deletes the stored cache, e.g. when the config entry is removed."""
+        self._index.clear()
+        self._shards.clear()
+        self._dirty.clear()
+        self._index_dirty = False
+        await self._index_store.async_remove()
+        for store in self._shard_stores:
+            await store.async_remove()
+
+    async def _async_shard(self, shard: int) -> dict[str, dict]:
+        """Returns the entries of a shard and loads them on first use.
+        Entries that are no longer in the index were evicted while the
+        shard wasn't loaded and are dropped.
+        """
+        if (entries := self._shards.get(shard)) is not None:
+            return entries
+        async with self._loading:
+            if (entries := self._shards.get(shard)) is None:
+                data = await self._shard_stores[shard].async_load() or {}
+                entries = {
+                    key: response
+                    for key, response in data.get("entries", {}).items()
+                    if key in self._index
+                }
+                self._shards[shard] = entries
+                if len(entries) != len(data.get("entries", {})):
+                    self._shard_changed(shard)
+                self.loads += 1
+        return entries
+
+    def _remove(self, key: str):
+        """Removes an entry from the index and from its shard if it is loaded.
+        Entries in shards that aren't loaded are dropped when the shard is loaded.
+        """
+        del self._index[key]
+        self._index_changed()
+        shard = self.shard(key)
+        if (entries := self._shards.get(shard)) is not None and key in entries:
+            del entries[key]
+            self._shard_changed(shard)
+
+    def _index_changed(self):
+        """Schedules a write of the index unless one is already pending.
+        The write picks up all changes made until then.
+        """
+        if not self._index_dirty:
+            self._index_dirty = True
+            self._index_store.async_delay_save(self._index_data, SAVE_DELAY)
+
+    def _shard_changed(self, shard: int):
+        """Schedules a write of a shard unless one is already pending."""
+        if shard not in self._dirty:
+            self._dirty.add(shard)
+            self._shard_stores[shard].async_delay_save(
+                lambda: self._shard_data(shard), SAVE_DELAY
+            )
+
+    def _index_data(self) -> dict:
+        """Returns the index as stored on disk and marks it as written."""
+        self._index_dirty = False
+        return {"entries": [[key, expires] for key, expires in self._index.items()]}
+
+    def _shard_data(self, shard: int) -> dict:
+        """Returns a copy of the entries of a shard as stored on disk and marks
+        the shard as written. The copy is serialised in the executor, while the
+        shard may change in the event loop.
+        """
+        self._dirty.discard(shard)
+        return {"entries": dict(self._shards.get(shard, {}))}
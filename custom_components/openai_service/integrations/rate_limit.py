@@ -0,0 +1,172 @@
+"""
+Token bucket rate limiting of requests and tokens per minute.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from homeassistant.exceptions import HomeAssistantError
+
+
+class TokenBucket:
+    """A bucket that holds up to `per_minute` units and refills continuously
+    at `per_minute` units per minute. `0` disables the limit.
+    """
+    def __init__(self, per_minute: int):
+        """Initialize the bucket full.
+
+        Args:
+            per_minute (int): Units per minute, `0` for no limit.
+        """
+        self.capacity = float(per_minute)
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        """Returns whether the bucket limits anything.
+
+        Returns:
+            bool: `True` if a limit is set.
+        """
+        return self.capacity > 0
+
+    @property
+    def level(self) -> float:
+        """Returns the units currently available.
+
+        Returns:
+            float: Available units.
+        """
+        now = time.monotonic()
+        self._level = min(
+            self.capacity, self._level + (now - self._updated) * self.capacity / 60
+        )
+        self._updated = now
+        return self._level
+
+    def wait_time(self, amount: float) -> float:
+        """Returns how long it takes until `amount` units are available.
+
+        Args:
+            amount (float): The units needed.
+
+        Returns:
+            float: Seconds to wait, `0` if they are available now.
+        """
+        if not self.enabled:
+            return 0.0
+        return max(0.0, (amount - self.level) * 60 / self.capacity)
+
+    def take(self, amount: float):
+        """Takes units out of the bucket. Returned units may overfill it up
+        to its capacity.
+
+        Args:
+            amount (float): The units, negative to return unused units.
+        """
+        if self.enabled:
+            self._level = min(self.capacity, self.level - amount)
+
+
+class RateLimiter:
+    """Limits the requests and tokens sent to an endpoint per minute.
+    Requests over the limit wait until the buckets have refilled, or are
+    rejected right away in `reject` mode or if they would wait longer than
+    `max_wait`.
+    """
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        mode: str = "queue",
+        max_wait: float = 30,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            requests_per_minute (int): Requests per minute, `0` for no limit.
+            tokens_per_minute (int): Prompt and completion tokens per minute,
+                `0` for no limit.
+            mode (str, optional): `queue` to wait for capacity or `reject`.
+            max_wait (float, optional): Seconds a request may wait.
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.mode = mode
+        self.max_wait = float(max_wait)
+        self.delayed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Returns whether any limit is set.
+
+        Returns:
+            bool: `True` if requests or tokens are limited.
+        """
+        return self.requests.enabled or self.tokens.enabled
+
+    @property
+    def stats(self) -> dict:
+        """Returns the limiter statistics.
+
+        Returns:
+            dict: Limits, available capacity and delay and rejection counters.
+        """
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "mode": self.mode,
+            "requests_available": self.requests.level,
+            "tokens_available": self.tokens.level,
+            "delayed": self.delayed,
+            "rejected": self.rejected,
+        }
+
+    async def acquire(self, tokens: int):
+        """Waits until a request with `tokens` tokens may be sent and takes
+        them from the buckets.
+
+        Args:
+            tokens (int): The tokens the request may use, prompt and `max_tokens`.
+
+        Raises:
+            RateLimited: The request is over the limit and may not wait for it.
+        """
+        if not self.enabled:
+            return
+        if self.tokens.enabled and tokens > self.tokens.capacity:
+            self.rejected += 1
+            raise RateLimited(
+                f"The request may use {tokens} tokens, more than the limit of "
+                f"{self.tokens.capacity:.0f} per minute"
+            )
+        deadline = time.monotonic() + self.max_wait
+        delayed = False
+        while (wait := max(self.requests.wait_time(1), self.tokens.wait_time(tokens))) > 0:
+            if self.mode == "reject" or time.monotonic() + wait > deadline:
+                self.rejected += 1
+                raise RateLimited(
+                    f"Rate limit of the endpoint reached, capacity is available in {wait:.1f} seconds"
+                )
+            if not delayed:
+                delayed = True
+                self.delayed += 1
+            await asyncio.sleep(wait)
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+    def refund(self, tokens: int):
+        """Returns tokens that were reserved but not used.
+
+        Args:
+            tokens (int): The unused tokens.
+        """
+        if tokens > 0:
+            self.tokens.take(-tokens)
+
+
+class RateLimited(HomeAssistantError):
+    """Error to indicate that a request was over the rate limit of the entry."""
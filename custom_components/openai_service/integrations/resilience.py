@@ -0,0 +1,234 @@
+"""
+Retries with exponential backoff and a circuit breaker for endpoint failures.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from email.utils import parsedate_to_datetime
+import logging
+import random
+import time
+from typing import TypeVar
+
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+MAX_RETRY_DELAY = 60
+
+
+class RetryPolicy:
+    """Retries failed requests with exponential backoff and full jitter.
+    A `Retry-After` header sent by the endpoint takes precedence.
+    """
+    def __init__(self, max_retries: int, base_delay: float):
+        """Initialize the policy.
+
+        Args:
+            max_retries (int): How often a failed request is retried.
+            base_delay (float): Seconds to wait before the first retry.
+        """
+        self.max_retries = int(max_retries)
+        self.base_delay = float(base_delay)
+        self.retries = 0
+        self.exhausted = 0
+
+    @property
+    def stats(self) -> dict:
+        """Returns the retry statistics.
+
+        Returns:
+            dict: Settings, number of retries and of requests that failed
+            after all retries.
+        """
+        return {
+            "max_retries": self.max_retries,
+            "base_delay": self.base_delay,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+        }
+
+    @staticmethod
+    def retryable(exc: Exception) -> bool:
+        """Returns whether a failed request may succeed when sent again.
+
+        Args:
+            exc (Exception): The error raised by the request.
+
+        Returns:
+            bool: `True` for connection errors, timeouts, rate limits and server errors.
+        """
+        from openai import APIConnectionError, APIStatusError  # pylint: disable=import-outside-toplevel
+
+        if isinstance(exc, APIConnectionError):
+            return True
+        if isinstance(exc, APIStatusError):
+            return exc.status_code in RETRYABLE_STATUS_CODES or exc.status_code >= 500
+        return False
+
+    def delay(self, attempt: int, exc: Exception) -> float:
+        """Returns the seconds to wait before the next attempt.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting at 0.
+            exc (Exception): The error raised by the request.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        if (retry_after := RetryPolicy.retry_after(exc)) is not None:
+            return min(retry_after, MAX_RETRY_DELAY)
+        return random.uniform(0, min(self.base_delay * 2**attempt, MAX_RETRY_DELAY))
+
+    @staticmethod
+    def retry_after(exc: Exception) -> float | None:
+        """Reads the delay requested by the endpoint from the response headers.
+
+        Args:
+            exc (Exception): The error raised by the request.
+
+        Returns:
+            float | None: Seconds to wait or `None` if the endpoint didn't say.
+        """
+        from openai import APIStatusError  # pylint: disable=import-outside-toplevel
+
+        if not isinstance(exc, APIStatusError):
+            return None
+        headers = exc.response.headers
+        if (value := headers.get("retry-after-ms")) is not None:
+            try:
+                return float(value) / 1000
+            except ValueError:
+                pass
+        if (value := headers.get("retry-after")) is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    async def run(self, request: Callable[[], Awaitable[_T]]) -> _T:
+        """Runs `request` and retries it while it fails with a retryable error.
+
+        Args:
+            request (Callable): Creates the awaitable that sends the request.
+
+        Returns:
+            The result of the request.
+        """
+        attempt = 0
+        while True:
+            try:
+                return await request()
+            except Exception as exc:  # pylint: disable=broad-except
+                if not RetryPolicy.retryable(exc):
+                    raise
+                if attempt >= self.max_retries:
+                    self.exhausted += 1
+                    raise
+                delay = self.delay(attempt, exc)
+                _LOGGER.debug(
+                    "OpenAI Service request failed (%s), retrying in %.1f seconds",
+                    exc,
+                    delay,
+                )
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Fails fast while the endpoint is down.
+    The breaker opens after `failure_threshold` consecutive failures and lets
+    requests through again after `reset_timeout` seconds. The first failure
+    after that opens it again, the first success closes it.
+    """
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_timeout (float): Seconds the breaker stays open.
+        """
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._open_until: float | None = None
+
+    @property
+    def state(self) -> str:
+        """Returns the breaker state.
+
+        Returns:
+            str: `closed`, `open` or `half_open`.
+        """
+        if self._open_until is None:
+            return "closed"
+        if time.monotonic() < self._open_until:
+            return "open"
+        return "half_open"
+
+    @property
+    def stats(self) -> dict:
+        """Returns the breaker statistics.
+
+        Returns:
+            dict: State, consecutive failures and how often the breaker
+            opened and rejected requests.
+        """
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout": self.reset_timeout,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+    def check(self):
+        """Raises if requests are currently not let through.
+
+        Raises:
+            EndpointUnavailable: The breaker is open.
+        """
+        if self.state == "open":
+            self.rejected += 1
+            raise EndpointUnavailable(
+                "The endpoint is failing, requests are paused for "
+                f"{self._open_until - time.monotonic():.0f} seconds"
+            )
+
+    def record_success(self):
+        """Closes the breaker after a successful request."""
+        self.failures = 0
+        self._open_until = None
+
+    def record_failure(self):
+        """Counts a failed request and opens the breaker if needed."""
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+                _LOGGER.warning(
+                    "OpenAI Service endpoint failed %s times in a row, "
+                    "pausing requests for %s seconds",
+                    self.failures,
+                    self.reset_timeout,
+                )
+            self._open_until = time.monotonic() + self.reset_timeout
+
+
+class EndpointUnavailable(HomeAssistantError):
+    """Error to indicate that requests are paused because the endpoint is failing."""
+
+
+class StreamInterrupted(HomeAssistantError):
+    """Error to indicate that a streamed response broke off after it had started."""
@@ -0,0 +1,103 @@
+"""
+An in-memory cache for analysed chat completion responses.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import time
+
+
+class ResponseCache:
+    """A LRU cache with a time-to-live for analysed chat completion responses.
+    Entries are keyed on a hash of the chat completion payload.
+    """
+    def __init__(self, ttl: float, max_entries: int):
+        """Initialize the cache.
+
+        Args:
+            ttl (float): Seconds an entry stays valid. `0` disables the cache.
+            max_entries (int): Maximum number of entries before the least
+            recently used entry is evicted.
+        """
+        self.ttl = float(ttl)
+        self.max_entries = int(max_entries)
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Returns whether the cache is in use.
+
+        Returns:
+            bool: `True` if both TTL and maximum entries are set.
+        """
+        return self.ttl > 0 and self.max_entries > 0
+
+    @property
+    def stats(self) -> dict:
+        """Returns the cache statistics.
+
+        Returns:
+            dict: Size, limits and hit, miss and eviction counters.
+        """
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        """Builds the cache key for a chat completion payload.
+
+        Args:
+            payload (dict): The chat completion settings.
+
+        Returns:
+            str: A SHA-256 hex digest of the normalised payload.
+        """
+        normalised = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        """Returns a copy of the cached response for `key`.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict | None: The cached response or `None` if missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def set(self, key: str, response: dict):
+        """Stores a response and evicts the least recently used entries
+        if the cache is full.
+
+        Args:
+            key (str): The cache key.
+            response (dict): The analysed response.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(response))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
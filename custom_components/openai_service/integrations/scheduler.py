@@ -0,0 +1,119 @@
+"""
+A concurrency limiter with a bounded priority queue in front of the endpoint.
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+from typing import AsyncIterator
+
+from homeassistant.exceptions import HomeAssistantError
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+
+class RequestScheduler:
+    """Limits how many requests are sent to the endpoint at once.
+    Requests beyond that limit wait in a bounded queue, ordered by priority
+    and then by arrival, and are rejected if they wait for too long.
+    """
+    def __init__(self, max_in_flight: int, max_queued: int, queue_timeout: float):
+        """Initialize the scheduler.
+
+        Args:
+            max_in_flight (int): Maximum number of concurrent requests.
+            max_queued (int): Maximum number of requests waiting for a slot.
+            queue_timeout (float): Seconds a request may wait for a slot.
+        """
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_queued = int(max_queued)
+        self.queue_timeout = float(queue_timeout)
+        self._in_flight = 0
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._arrival = itertools.count()
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def stats(self) -> dict:
+        """Returns the scheduler statistics.
+
+        Returns:
+            dict: Limits, current load and rejection counters.
+        """
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queued": self.max_queued,
+            "queue_timeout": self.queue_timeout,
+            "in_flight": self._in_flight,
+            "queued": len(self._waiting),
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "normal") -> AsyncIterator[None]:
+        """Waits for a free slot and holds it while the context is active.
+
+        Args:
+            priority (str, optional): `high`, `normal` or `low`. Defaults to `normal`.
+
+        Raises:
+            QueueFull: Too many requests are already waiting.
+            QueueTimeout: No slot became free within `queue_timeout`.
+        """
+        await self._acquire(PRIORITIES.get(priority, PRIORITIES["normal"]))
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, rank: int):
+        """Takes a free slot or waits in the queue until one is handed over."""
+        if self._in_flight < self.max_in_flight and not self._waiting:
+            self._in_flight += 1
+            return
+        if len(self._waiting) >= self.max_queued:
+            self.rejected += 1
+            raise QueueFull("Too many requests are waiting for the endpoint")
+        future = asyncio.get_running_loop().create_future()
+        entry = (rank, next(self._arrival), future)
+        heapq.heappush(self._waiting, entry)
+        try:
+            async with asyncio.timeout(self.queue_timeout):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before we gave up.
+                self._release()
+            else:
+                future.cancel()
+                # `_release` may already have dropped the cancelled entry.
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+            if isinstance(exc, TimeoutError):
+                self.timed_out += 1
+                raise QueueTimeout(
+                    f"No free slot for the endpoint within {self.queue_timeout} seconds"
+                ) from exc
+            raise
+
+    def _release(self):
+        """Hands the slot over to the next waiting request or frees it."""
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._in_flight -= 1
+
+
+class QueueFull(HomeAssistantError):
+    """Error to indicate that too many requests are waiting for the endpoint."""
+
+
+class QueueTimeout(HomeAssistantError):
+    """Error to indicate that a request waited too long for the endpoint."""
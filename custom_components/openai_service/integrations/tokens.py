@@ -0,0 +1,183 @@
+"""
+Estimates the prompt tokens of a chat completion before it is sent.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.exceptions import HomeAssistantError
+
+if TYPE_CHECKING:
+    from tiktoken import Encoding
+
+_LOGGER = logging.getLogger(__name__)
+# Chat models wrap every message in a few tokens and prime the reply with a few more.
+MESSAGE_OVERHEAD = 3
+REPLY_OVERHEAD = 3
+# Answers shorter than this are not worth clamping to, the request is rejected.
+MIN_COMPLETION_TOKENS = 16
+COUNT_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=8)
+def load_encoding(model: str) -> Encoding | None:
+    """Returns the tokenizer of a model, if `tiktoken` is installed and knows
+    the model. Blocking on first use, run it in the executor.
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        Encoding | None: The tokenizer or `None` to use the heuristic.
+    """
+    try:
+        import tiktoken  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:  # pylint: disable=broad-except
+        # Unknown model, e.g. on a custom endpoint, or the tokenizer couldn't be downloaded.
+        _LOGGER.debug("OpenAI Service has no tokenizer for %s, estimating tokens", model)
+        return None
+
+
+@lru_cache(maxsize=COUNT_CACHE_SIZE)
+def count_tokens(encoding: Encoding | None, text: str) -> int:
+    """Counts the tokens of a text. The mood is the same for most requests,
+    so counts are cached.
+
+    Args:
+        encoding (Encoding | None): The tokenizer or `None` to use the heuristic.
+        text (str): The text to count.
+
+    Returns:
+        int: The number of tokens.
+    """
+    if encoding is None:
+        # English text averages about four characters per token.
+        return len(text) // 4 + 1
+    return len(encoding.encode_ordinary(text))
+
+
+class TokenEstimator:
+    """Estimates the prompt tokens of chat completions and keeps requests
+    within the context window of the model.
+
+    Uses the model's tokenizer from `tiktoken` once `load` has run and the
+    model is known, and a heuristic of about four characters per token
+    otherwise.
+    """
+    def __init__(self, model: str, context_size: int, overflow: str = "clamp"):
+        """Initialize the estimator.
+
+        Args:
+            model (str): The model name.
+            context_size (int): Context window of the model in tokens.
+            overflow (str, optional): `clamp` to reduce `max_tokens` to what is
+                left of the context window, `reject` to fail the request.
+        """
+        self.model = model
+        self.context_size = int(context_size)
+        self.overflow = overflow
+        self._encoding: Encoding | None = None
+        self.clamped = 0
+        self.rejected = 0
+
+    @property
+    def tokenizer(self) -> str:
+        """Returns how tokens are counted.
+
+        Returns:
+            str: The name of the `tiktoken` encoding or `heuristic`.
+        """
+        return "heuristic" if self._encoding is None else self._encoding.name
+
+    @property
+    def stats(self) -> dict:
+        """Returns the estimator statistics.
+
+        Returns:
+            dict: The tokenizer in use, the context size and how many requests
+            were clamped or rejected.
+        """
+        return {
+            "tokenizer": self.tokenizer,
+            "context_size": self.context_size,
+            "overflow": self.overflow,
+            "clamped": self.clamped,
+            "rejected": self.rejected,
+        }
+
+    def load(self):
+        """Loads the tokenizer of the model. Blocking, run it in the executor."""
+        self._encoding = load_encoding(self.model)
+
+    def count(self, text: str) -> int:
+        """Counts the tokens of a text.
+
+        Args:
+            text (str): The text to count.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return count_tokens(self._encoding, text)
+
+    def count_message(self, message: dict) -> int:
+        """Counts the tokens of a chat message, including its wrapping.
+
+        Args:
+            message (dict): A message of the chat completion.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return MESSAGE_OVERHEAD + self.count(message["content"] or "")
+
+    def estimate(self, messages: list) -> int:
+        """Estimates the prompt tokens of a list of chat messages.
+
+        Args:
+            messages (list): The `messages` of the chat completion.
+
+        Returns:
+            int: The estimated prompt tokens.
+        """
+        return REPLY_OVERHEAD + sum(self.count_message(message) for message in messages)
+
+    def completion_budget(self, messages: list, max_tokens: int) -> int:
+        """Checks that the messages and the answer fit into the context window.
+
+        Args:
+            messages (list): The `messages` of the chat completion.
+            max_tokens (int): The requested maximum tokens of the answer.
+
+        Raises:
+            PromptTooLong: If the messages leave less than `MIN_COMPLETION_TOKENS`
+                for the answer, or any less than `max_tokens` with `reject`.
+
+        Returns:
+            int: `max_tokens`, or what is left of the context window if that is less.
+        """
+        available = self.context_size - self.estimate(messages)
+        if available >= max_tokens:
+            return max_tokens
+        if self.overflow == "clamp" and available >= MIN_COMPLETION_TOKENS:
+            _LOGGER.debug(
+                "OpenAI Service clamped max_tokens from %s to %s", max_tokens, available
+            )
+            self.clamped += 1
+            return available
+        self.rejected += 1
+        raise PromptTooLong(
+            f"The prompt needs about {self.context_size - available} tokens, which leaves "
+            f"{max(available, 0)} of the {self.context_size} token context window "
+            f"for the answer instead of {max_tokens}"
+        )
+
+
+class PromptTooLong(HomeAssistantError):
+    """Error to indicate that a request doesn't fit into the context window."""
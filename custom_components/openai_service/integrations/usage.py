@@ -0,0 +1,185 @@
+"""
+A persisted daily tally of the tokens used and their estimated cost.
+"""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import datetime
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from ..const import DOMAIN, MODEL_PRICES
+
+STORAGE_VERSION = 1
+# Seconds changes are collected before they are written.
+SAVE_DELAY = 60
+HISTORY_DAYS = 31
+
+
+def model_prices(model: str) -> tuple[float, float]:
+    """Returns the list prices of an OpenAI model.
+
+    Args:
+        model (str): The model name, e.g. `gpt-4-0613`.
+
+    Returns:
+        tuple[float, float]: USD per million prompt and completion tokens,
+        `(0, 0)` for unknown models.
+    """
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return (0.0, 0.0)
+
+
+def empty_tally() -> dict:
+    """Returns a tally without any usage."""
+    return {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0}
+
+
+class UsageTally:
+    """Adds up the token usage and its cost per day and in total, and keeps
+    them in `.storage` so that they survive restarts. The last `HISTORY_DAYS`
+    days are kept.
+    """
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        prompt_price: float,
+        completion_price: float,
+    ):
+        """Initialize the tally.
+
+        Args:
+            hass (HomeAssistant): The Home Assistant instance.
+            entry_id (str): The config entry the tally belongs to.
+            prompt_price (float): USD per million prompt tokens.
+            completion_price (float): USD per million completion tokens.
+        """
+        self.hass = hass
+        self.prompt_price = float(prompt_price)
+        self.completion_price = float(completion_price)
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.usage")
+        self.total = empty_tally()
+        self.days: dict[str, dict] = {}
+        self._dirty = False
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def today(self) -> dict:
+        """Returns the tally of the current day.
+
+        Returns:
+            dict: Requests, prompt and completion tokens and cost in USD.
+        """
+        return self.days.get(dt_util.now().date().isoformat(), empty_tally())
+
+    @property
+    def day_started(self) -> datetime:
+        """Returns when the current day started.
+
+        Returns:
+            datetime: Local midnight.
+        """
+        return dt_util.start_of_local_day()
+
+    @property
+    def stats(self) -> dict:
+        """Returns the tally.
+
+        Returns:
+            dict: The prices, the total and the tally of each kept day.
+        """
+        return {
+            "prompt_price": self.prompt_price,
+            "completion_price": self.completion_price,
+            "total": self.total,
+            "days": self.days,
+        }
+
+    async def async_load(self):
+        """Loads the stored tally."""
+        data = await self._store.async_load() or {}
+        self.total = {**empty_tally(), **data.get("total", {})}
+        self.days = data.get("days", {})
+
+    @callback
+    def async_track_midnight(self) -> CALLBACK_TYPE:
+        """Notifies the listeners when a new day starts.
+
+        Returns:
+            CALLBACK_TYPE: Stops tracking.
+        """
+        return async_track_time_change(self.hass, self._midnight, hour=0, minute=0, second=0)
+
+    def add_listener(self, update_callback: Callable[[], None]) -> Callable[[], None]:
+        """Registers a callback that is called whenever the tally changes.
+
+        Args:
+            update_callback (Callable): Called without arguments in the event loop.
+
+        Returns:
+            Callable: Removes the listener again.
+        """
+        self._listeners.append(update_callback)
+        return lambda: self._listeners.remove(update_callback)
+
+    def record(self, usage):
+        """Adds the token usage of a response and its cost.
+
+        Args:
+            usage: The `usage` of a chat completion response. May be `None`.
+        """
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cost = (
+            prompt_tokens * self.prompt_price + completion_tokens * self.completion_price
+        ) / 1_000_000
+        day = dt_util.now().date().isoformat()
+        if day not in self.days:
+            self.days[day] = empty_tally()
+            for old_day in sorted(self.days)[:-HISTORY_DAYS]:
+                del self.days[old_day]
+        for tally in (self.total, self.days[day]):
+            tally["requests"] += 1
+            tally["prompt_tokens"] += prompt_tokens
+            tally["completion_tokens"] += completion_tokens
+            tally["cost"] += cost
+        if not self._dirty:
+            self._dirty = True
+            self._store.async_delay_save(self._data, SAVE_DELAY)
+        self._notify()
+
+    async def async_flush(self):
+        """Writes pending changes right away, e.g. before the entry is unloaded."""
+        if self._dirty:
+            await self._store.async_save(self._data())
+
+    async def async_remove(self):
+        """Deletes the stored tally, e.g. when the config entry is removed."""
+        self._dirty = False
+        await self._store.async_remove()
+
+    def _data(self) -> dict:
+        """Returns a copy of the tally as stored on disk and marks it as written."""
+        self._dirty = False
+        return {
+            "total": dict(self.total),
+            "days": {day: dict(tally) for day, tally in self.days.items()},
+        }
+
+    @callback
+    def _midnight(self, now: datetime):
+        """Lets the listeners reset the daily values."""
+        self._notify()
+
+    def _notify(self):
+        """Calls the registered listeners."""
+        for update_callback in list(self._listeners):
+            update_callback()
@@ -0,0 +1,190 @@
+"""Sensors reporting the performance of an OpenAI Service endpoint."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .integrations.openai_service import OpenAIService
+
+CURRENCY_USD = "USD"
+
+
+@dataclass(frozen=True, kw_only=True)
+class OpenAIServiceSensorEntityDescription(SensorEntityDescription):
+    """Describes an OpenAI Service sensor."""
+
+    value_fn: Callable[[OpenAIService], float | int | None]
+    last_reset_fn: Callable[[OpenAIService], datetime | None] = lambda service: None
+
+
+def _milliseconds(seconds: float | None) -> float | None:
+    """Converts a duration in seconds to milliseconds."""
+    return None if seconds is None else seconds * 1000
+
+
+def _duration(key: str, window: str, percent: int, **kwargs) -> OpenAIServiceSensorEntityDescription:
+    """Describes a sensor for a percentile of a rolling window of durations."""
+    return OpenAIServiceSensorEntityDescription(
+        key=key,
+        translation_key=key,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=0,
+        value_fn=lambda service: _milliseconds(
+            getattr(service.metrics, window).percentile(percent)
+        ),
+        **kwargs,
+    )
+
+
+SENSORS: tuple[OpenAIServiceSensorEntityDescription, ...] = (
+    OpenAIServiceSensorEntityDescription(
+        key="requests",
+        translation_key="requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda service: service.metrics.requests,
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="errors",
+        translation_key="errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda service: service.metrics.errors,
+    ),
+    _duration("latency_p50", "latency", 50),
+    _duration("latency_p95", "latency", 95),
+    _duration("first_token_p50", "first_token", 50),
+    _duration("first_token_p95", "first_token", 95, entity_registry_enabled_default=False),
+    _duration("analysis_p50", "analysis", 50, entity_category=EntityCategory.DIAGNOSTIC),
+    _duration(
+        "analysis_p95",
+        "analysis",
+        95,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="prompt_tokens",
+        translation_key="prompt_tokens",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda service: service.metrics.prompt_tokens,
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="completion_tokens",
+        translation_key="completion_tokens",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda service: service.metrics.completion_tokens,
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="estimate_error_p50",
+        translation_key="estimate_error_p50",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=PERCENTAGE,
+        suggested_display_precision=1,
+        value_fn=lambda service: service.metrics.estimate_error.percentile(50),
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="tokens_today",
+        translation_key="tokens_today",
+        state_class=SensorStateClass.TOTAL,
+        value_fn=lambda service: service.usage.today["prompt_tokens"]
+        + service.usage.today["completion_tokens"],
+        last_reset_fn=lambda service: service.usage.day_started,
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="cost_today",
+        translation_key="cost_today",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=CURRENCY_USD,
+        suggested_display_precision=2,
+        value_fn=lambda service: service.usage.today["cost"],
+        last_reset_fn=lambda service: service.usage.day_started,
+    ),
+    OpenAIServiceSensorEntityDescription(
+        key="cost_total",
+        translation_key="cost_total",
+        device_class=SensorDeviceClass.MONETARY,
+        state_class=SensorStateClass.TOTAL,
+        native_unit_of_measurement=CURRENCY_USD,
+        suggested_display_precision=2,
+        value_fn=lambda service: service.usage.total["cost"],
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the sensors of an OpenAI Service config entry."""
+    openai_service = hass.data[DOMAIN][entry.entry_id]
+    async_add_entities(
+        OpenAIServiceSensor(entry, openai_service, description)
+        for description in SENSORS
+    )
+
+
+class OpenAIServiceSensor(SensorEntity):
+    """A sensor that reports one of the metrics or the usage of an endpoint."""
+
+    entity_description: OpenAIServiceSensorEntityDescription
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        openai_service: OpenAIService,
+        description: OpenAIServiceSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor.
+
+        Args:
+            entry (ConfigEntry): The config entry of the endpoint.
+            openai_service (OpenAIService): The service of the endpoint.
+            description (OpenAIServiceSensorEntityDescription): What to report.
+        """
+        self.entity_description = description
+        self._service = openai_service
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            entry_type=DeviceEntryType.SERVICE,
+            model=openai_service.model,
+        )
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Returns the current value of the metric."""
+        return self.entity_description.value_fn(self._service)
+
+    @property
+    def last_reset(self) -> datetime | None:
+        """Returns when a daily value was reset."""
+        return self.entity_description.last_reset_fn(self._service)
+
+    async def async_added_to_hass(self) -> None:
+        """Update the state whenever the metrics or the usage change."""
+        self.async_on_remove(self._service.metrics.add_listener(self._handle_update))
+        self.async_on_remove(self._service.usage.add_listener(self._handle_update))
+
+    @callback
+    def _handle_update(self) -> None:
+        """Write the new state."""
+        self.async_write_ha_state()
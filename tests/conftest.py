@@ -0,0 +1,97 @@
+"""
+Fixtures that drive `OpenAIService` against the local stub server.
+
+Coroutine tests run in the event loop of the `loop` fixture, so the suite
+needs nothing but pytest.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+from pathlib import Path
+import sys
+
+import pytest
+
+ROOT = Path(__file__).parents[1]
+sys.path[:0] = [str(ROOT), str(ROOT / "benchmarks")]
+
+# pylint: disable=wrong-import-position
+from helpers import create_hass, create_service  # noqa: E402
+from stub_server import StubServer  # noqa: E402
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Runs coroutine tests in the event loop of the `loop` fixture."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {
+        name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames  # pylint: disable=protected-access
+    }
+    pyfuncitem.funcargs["loop"].run_until_complete(pyfuncitem.obj(**arguments))
+    return True
+
+
+def pytest_collection_modifyitems(items):
+    """Gives every coroutine test the `loop` fixture."""
+    for item in items:
+        if inspect.iscoroutinefunction(getattr(item, "obj", None)):
+            item.fixturenames.insert(0, "loop")
+
+
+@pytest.fixture
+def loop():
+    """An event loop for the test."""
+    event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    yield event_loop
+    event_loop.run_until_complete(event_loop.shutdown_asyncgens())
+    event_loop.close()
+    asyncio.set_event_loop(None)
+
+
+@pytest.fixture
+def hass(loop):
+    """A bare Home Assistant instance."""
+
+    async def create():
+        return create_hass()
+
+    instance = loop.run_until_complete(create())
+    yield instance
+    loop.run_until_complete(instance.async_stop(force=True))
+
+
+@pytest.fixture
+def stub_server(loop):
+    """Starts stub servers, e.g. `await stub_server(latency=0.02)`, and stops
+    them after the test. Takes the arguments of `StubServer`."""
+    servers: list[StubServer] = []
+
+    async def start(**kwargs) -> StubServer:
+        server = StubServer(**kwargs)
+        await server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        loop.run_until_complete(server.stop())
+
+
+@pytest.fixture
+def openai_service(loop, hass):
+    """Creates services for a stub server, e.g. `openai_service(server.url,
+    {"cache_ttl": 60})`, and closes their clients after the test. Takes the
+    arguments of `create_service`."""
+    services = []
+
+    def create(url: str, options: dict | None = None, data: dict | None = None):
+        service = create_service(hass, url, options, data)
+        services.append(service)
+        return service
+
+    yield create
+    for service in services:
+        loop.run_until_complete(service.async_close())
@@ -0,0 +1,66 @@
+"""
+A `send_batch` call answers every item in order, isolates failing items and
+processes at most `parallelism` items at a time.
+"""
+from __future__ import annotations
+
+from helpers import service_call
+
+from custom_components.openai_service import BATCH_SCHEMA
+
+MESSAGES = [f"Message number {i}." for i in range(8)]
+
+
+def batch_call(**data):
+    """Build a `send_batch` service call with `data`, validated by its schema."""
+    return service_call(**BATCH_SCHEMA({"items": [{"message": m} for m in MESSAGES], **data}))
+
+
+async def test_responses_keep_the_item_order(stub_server, openai_service):
+    """Items that finish out of order are answered in the order they were sent."""
+    server = await stub_server(latency=0.01, jitter=0.05)
+    service = openai_service(server.url)
+    result = await service.batch_completion(batch_call(parallelism=8))
+    assert [response["response"] for response in result["responses"]] == [
+        f"You said: {m}" for m in MESSAGES
+    ]
+
+
+async def test_failed_item_fails_alone(stub_server, openai_service):
+    """An item the endpoint fails for gets an error, the others their answers."""
+    server = await stub_server()
+    service = openai_service(server.url, {"max_retries": 0})
+    # One item at a time, so the first item is the one that gets the error.
+    server.fail_next(1)
+    result = await service.batch_completion(batch_call(parallelism=1))
+    responses = result["responses"]
+    assert len(responses) == len(MESSAGES)
+    assert "error" in responses[0]
+    assert [response["response"] for response in responses[1:]] == [
+        f"You said: {m}" for m in MESSAGES[1:]
+    ]
+
+
+async def test_parallelism_is_capped(stub_server, openai_service):
+    """No more than `parallelism` items are sent at the same time."""
+    server = await stub_server(latency=0.02)
+    service = openai_service(server.url, {"batch_parallelism": 3})
+    chat_completion = service.chat_completion
+    running = peak = 0
+
+    async def counting(call):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            return await chat_completion(call)
+        finally:
+            running -= 1
+
+    service.chat_completion = counting
+    await service.batch_completion(batch_call())
+    assert peak == 3
+    peak = 0
+    await service.batch_completion(batch_call(parallelism=2))
+    assert peak == 2
+    assert server.received == 2 * len(MESSAGES)
@@ -0,0 +1,65 @@
+"""
+Overlapping calls on one config entry must not mix up their state.
+"""
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import sys
+
+from helpers import service_call
+from stub_server import StubServer
+
+from custom_components.openai_service.integrations.chat_service import ChatService
+
+CALLS = 300
+THREADS = 4
+REPLIES = {
+    "en": "The Moon is about 238,900 miles away. Dr. Smith measured it in 1969! Did you know that?",
+    "de": "Die Nacht beginnt um ca. 21 Uhr. Die genaue Zeit variiert je nach Saison.",
+}
+
+
+async def test_overlapping_calls_get_their_own_answers(stub_server, openai_service):
+    """Hundreds of interleaved calls each receive the answer to their message."""
+    server = await stub_server(latency=0.01, jitter=0.05)
+    # Let every call through, the test is about overlapping calls, not queueing.
+    service = openai_service(server.url, {"max_in_flight": CALLS, "max_queued": CALLS})
+    messages = [f"Message number {i}." for i in range(CALLS)]
+    responses = await asyncio.gather(
+        *(service.chat_completion(service_call(message=m)) for m in messages)
+    )
+    assert [response["response"] for response in responses] == [
+        StubServer.reply_for({"messages": [{"content": m}]}) for m in messages
+    ]
+
+
+async def test_injected_errors_are_retried(stub_server, openai_service):
+    """Server errors are retried and the caller gets the answer."""
+    server = await stub_server()
+    service = openai_service(server.url, {"max_retries": 2, "retry_delay": 0.01})
+    server.fail_next(2)
+    response = await service.chat_completion(service_call(message="Hello."))
+    assert response["response"] == "You said: Hello."
+    assert server.received == 3
+
+
+def test_segmentation_in_threads():
+    """Segmenting from several executor threads returns the same sentences
+    as segmenting one text after another."""
+    replies = [
+        (f"{text} Reply number {number}.", language)
+        for number in range(500)
+        for language, text in REPLIES.items()
+    ]
+    expected = [ChatService.segment_text(text, language) for text, language in replies]
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(THREADS) as executor:
+            results = list(
+                executor.map(lambda reply: ChatService.segment_text(*reply), replies)
+            )
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert results == expected
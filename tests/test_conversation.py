@@ -0,0 +1,63 @@
+"""
+Conversation memory keeps every turn once and trims only what is sent.
+"""
+from __future__ import annotations
+
+import asyncio
+
+from helpers import service_call
+
+from custom_components.openai_service.integrations.conversation import ConversationMemory
+from custom_components.openai_service.integrations.tokens import TokenEstimator
+
+
+def test_history_is_trimmed_without_forgetting():
+    """A small budget leaves out old turns, a later larger one sends them again."""
+    memory = ConversationMemory(ttl=60, context_size=4096)
+    tokens = TokenEstimator("stub-model", 4096)
+    for number in range(5):
+        memory.append("kitchen", f"Question {number}?", f"Answer {number}.")
+    newest = memory.history("kitchen", 15, tokens)
+    assert [message["content"] for message in newest] == ["Question 4?", "Answer 4."]
+    assert tokens.estimate(newest) - tokens.estimate([]) <= 15
+    assert len(memory.history("kitchen", 1000, tokens)) == 10
+    assert memory.history("kitchen", 0, tokens) == []
+    assert memory.stats["turns"] == 10
+
+
+async def test_coalesced_calls_remember_the_turn_once(stub_server, openai_service):
+    """Identical calls in flight at the same time add their turn once, calls of
+    other conversations get their own request."""
+    server = await stub_server(latency=0.05)
+    service = openai_service(server.url)
+    await asyncio.gather(
+        *(
+            service.chat_completion(service_call(message="Hello.", conversation_id=cid))
+            for cid in ("kitchen", "kitchen", "garden")
+        )
+    )
+    assert server.received == 2
+    assert service.coalesced_requests == 1
+    for conversation_id in ("kitchen", "garden"):
+        assert len(service.conversations.history(conversation_id, 1000, service.tokens)) == 2
+
+
+async def test_trimmed_history_fits_the_context(stub_server, openai_service):
+    """The history is trimmed to what the context window check accepts, so a
+    long conversation isn't rejected."""
+    server = await stub_server()
+    service = openai_service(
+        server.url, {"context_size": 1024, "max_tokens": 200, "context_overflow": "reject"}
+    )
+    for number in range(20):
+        service.conversations.append(
+            "kitchen", f"{number:03} " + "q" * 96, f"{number:03} " + "a" * 96
+        )
+    response = await service.chat_completion(
+        service_call(message="And now?", conversation_id="kitchen")
+    )
+    assert response["response"] == "You said: And now?"
+    sent = server.requests[-1]["messages"]
+    assert 2 < len(sent) < 42
+    assert service.tokens.estimate(sent) + 200 <= 1024
+    assert service.tokens.rejected == 0
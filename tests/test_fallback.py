@@ -0,0 +1,106 @@
+"""
+The fallback endpoint answers with the primary's messages and its own
+context window, when the primary fails or is slow.
+"""
+from __future__ import annotations
+
+import time
+
+from helpers import service_call
+
+from custom_components.openai_service.const import DOMAIN
+
+# About 500 tokens, more than a context window of 512 leaves room for.
+LONG_MESSAGE = "Please summarise this. " * 87
+# About 300 tokens, which leaves less than `max_tokens` in a context window of 512.
+MEDIUM_MESSAGE = "Please summarise this. " * 52
+
+
+async def create_pair(hass, stub_server, openai_service, primary: dict, fallback: dict):
+    """Returns two stub servers and a primary service that falls back to the second."""
+    primary_server = await stub_server()
+    fallback_server = await stub_server()
+    fallback_service = openai_service(fallback_server.url, fallback)
+    primary_service = openai_service(
+        primary_server.url,
+        {"max_retries": 0, "fallback_entry": fallback_service.entry.entry_id, **primary},
+    )
+    hass.data[DOMAIN] = {
+        service.entry.entry_id: service for service in (primary_service, fallback_service)
+    }
+    return primary_server, fallback_server, primary_service, fallback_service
+
+
+async def test_fallback_context_does_not_limit_primary(hass, stub_server, openai_service):
+    """A prompt that only fits the primary's context window is sent to the primary."""
+    primary_server, fallback_server, primary, _ = await create_pair(
+        hass, stub_server, openai_service, {"context_size": 8192}, {"context_size": 512}
+    )
+    await primary.chat_completion(service_call(message=LONG_MESSAGE))
+    assert (primary_server.received, fallback_server.received) == (1, 0)
+
+
+async def test_prompt_too_long_falls_back(hass, stub_server, openai_service):
+    """A prompt that doesn't fit the primary's context window goes to the fallback."""
+    primary_server, fallback_server, primary, _ = await create_pair(
+        hass, stub_server, openai_service, {"context_size": 512}, {"context_size": 8192}
+    )
+    response = await primary.chat_completion(service_call(message=LONG_MESSAGE))
+    assert response["response"] == f"You said: {LONG_MESSAGE}"
+    assert (primary_server.received, fallback_server.received) == (0, 1)
+    assert fallback_server.requests[0]["max_tokens"] == 300
+
+
+async def test_fallback_clamps_against_sent_messages(hass, stub_server, openai_service):
+    """The fallback clamps `max_tokens` for the messages it actually sends."""
+    primary_server, fallback_server, primary, fallback = await create_pair(
+        hass, stub_server, openai_service, {"context_size": 8192}, {"context_size": 512}
+    )
+    primary.conversations.append("kitchen", MEDIUM_MESSAGE, "Done.")
+    primary_server.fail_next(1)
+    await primary.chat_completion(
+        service_call(message="And now?", mood="Answer briefly.", conversation_id="kitchen")
+    )
+    sent = fallback_server.requests[0]
+    assert [message["content"] for message in sent["messages"]] == [
+        "Answer briefly.", MEDIUM_MESSAGE, "Done.", "And now?"
+    ]
+    assert sent["max_tokens"] == 512 - fallback.tokens.estimate(sent["messages"])
+    assert fallback.tokens.clamped == 1
+    assert primary.tokens.clamped == 0
+
+
+async def test_hedged_request(hass, stub_server, openai_service):
+    """A slow primary is hedged after `hedge_after` and the fallback answers."""
+    primary_server, _, primary, _ = await create_pair(
+        hass, stub_server, openai_service, {"hedge_after": 0.05}, {}
+    )
+    primary_server.latency = 0.5
+    started = time.perf_counter()
+    response = await primary.chat_completion(service_call(message="Hello."))
+    assert time.perf_counter() - started < 0.4
+    assert response["response"] == "You said: Hello."
+    assert (primary.fallback_stats["hedged_requests"], primary.fallbacks) == (1, 1)
+
+
+async def test_fast_failure_is_not_hedged(hass, stub_server, openai_service):
+    """A primary that fails before `hedge_after` falls back without hedging."""
+    primary_server, fallback_server, primary, _ = await create_pair(
+        hass, stub_server, openai_service, {"hedge_after": 1}, {}
+    )
+    primary_server.fail_next(1)
+    started = time.perf_counter()
+    await primary.chat_completion(service_call(message="Hello."))
+    assert time.perf_counter() - started < 0.5
+    assert fallback_server.received == 1
+    assert (primary.fallback_stats["hedged_requests"], primary.fallbacks) == (0, 1)
+
+
+async def test_fast_primary_is_not_hedged(hass, stub_server, openai_service):
+    """A primary that answers within `hedge_after` doesn't start the fallback."""
+    _, fallback_server, primary, _ = await create_pair(
+        hass, stub_server, openai_service, {"hedge_after": 1}, {}
+    )
+    await primary.chat_completion(service_call(message="Hello."))
+    assert fallback_server.received == 0
+    assert (primary.fallback_stats["hedged_requests"], primary.fallbacks) == (0, 0)
@@ -0,0 +1,173 @@
+"""
+Load tests of `OpenAIService.chat_completion` against the local stub server.
+
+Cover the end-to-end latency, throughput at several concurrency levels, how
+long the event loop is blocked and how much memory grows over thousands of
+calls, so that regressions in client reuse, caching or the analysis pipeline
+are caught without network access. Measurements are printed, run with `-s`
+to see them.
+"""
+from __future__ import annotations
+
+import asyncio
+import gc
+import statistics
+import time
+import tracemalloc
+
+from helpers import service_call
+
+POOL_SIZE = 10
+LATENCY = 0.02
+CONCURRENCY_LEVELS = (1, 4, 16, 64)
+THROUGHPUT_CALLS = 200
+MEMORY_CALLS = 2000
+MEMORY_CONCURRENCY = 16
+MAX_LATENCY_OVERHEAD = 0.05
+MAX_LOOP_BLOCKING = 0.05
+MAX_MEMORY_GROWTH_PER_CALL = 512
+
+SENTENCES = (
+    "The quick brown fox jumps over the lazy dog.",
+    "Der schnelle braune Fuchs springt über den faulen Hund.",
+    "Is it going to rain tomorrow?",
+    "Morgen wird es in Berlin sonnig und warm.",
+)
+OPTIONS = {
+    "pool_size": POOL_SIZE,
+    "max_in_flight": max(CONCURRENCY_LEVELS),
+    "max_queued": MEMORY_CALLS,
+    "analysis_workers": 4,
+}
+
+
+class LoopMonitor:
+    """Measures how late a periodic timer fires, i.e. how long the event
+    loop was blocked by something else.
+    """
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.delays: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.delays.append(time.perf_counter() - started - self.interval)
+
+    def start(self):
+        """Start measuring."""
+        self.delays.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> float:
+        """Stop measuring and return the longest delay in seconds."""
+        self._task.cancel()
+        return max(self.delays, default=0.0)
+
+
+def message(number: int, sentences: int = 2) -> str:
+    """Returns a distinct message with `sentences` sentences to analyse."""
+    return " ".join(
+        [SENTENCES[(number + i) % len(SENTENCES)] for i in range(sentences)] + [f"{number}."]
+    )
+
+
+async def run_calls(
+    service, count: int, concurrency: int, offset: int = 0, sentences: int = 2, **data
+) -> list:
+    """Sends `count` distinct requests with at most `concurrency` at a time
+    and returns the latency of each."""
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(number: int) -> float:
+        async with slots:
+            started = time.perf_counter()
+            await service.chat_completion(
+                service_call(message=message(number, sentences), **data)
+            )
+            return time.perf_counter() - started
+
+    return await asyncio.gather(*(one(offset + i) for i in range(count)))
+
+
+async def warm_service(stub_server, openai_service, **options):
+    """Returns a stub server and a service that has loaded the language model."""
+    server = await stub_server(latency=LATENCY, keep_requests=0)
+    service = openai_service(server.url, {**OPTIONS, **options})
+    await run_calls(service, 4, 4, offset=-4)
+    return server, service
+
+
+async def test_latency_overhead(stub_server, openai_service):
+    """Analysis and client overhead add little to the endpoint's latency."""
+    server, service = await warm_service(stub_server, openai_service)
+    latencies = await run_calls(service, 50, 1)
+    streamed = await run_calls(service, 50, 1, offset=50, stream=True)
+    overhead = statistics.median(latencies) - server.latency
+    print(
+        f"latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+        f"streamed p50 {statistics.median(streamed) * 1000:.1f} ms"
+    )
+    assert overhead < MAX_LATENCY_OVERHEAD
+    assert statistics.median(streamed) - server.latency < MAX_LATENCY_OVERHEAD
+
+
+async def test_event_loop_not_blocked(stub_server, openai_service):
+    """Long responses are analysed in the executor, not on the event loop."""
+    _, service = await warm_service(stub_server, openai_service)
+    monitor = LoopMonitor()
+    monitor.start()
+    await run_calls(service, 20, 1, sentences=160)
+    blocking = monitor.stop()
+    print(f"event loop blocked up to {blocking * 1000:.1f} ms")
+    assert blocking < MAX_LOOP_BLOCKING
+
+
+async def test_throughput_and_connection_reuse(stub_server, openai_service):
+    """Concurrent calls share the pooled connections and scale with concurrency."""
+    server, service = await warm_service(stub_server, openai_service)
+    server.connections.clear()
+    throughput = {}
+    for concurrency in CONCURRENCY_LEVELS:
+        started = time.perf_counter()
+        await run_calls(service, THROUGHPUT_CALLS, concurrency, offset=concurrency * 1000)
+        throughput[concurrency] = THROUGHPUT_CALLS / (time.perf_counter() - started)
+        print(f"throughput at concurrency {concurrency}: {throughput[concurrency]:.1f} calls/s")
+    assert len(server.connections) <= POOL_SIZE
+    assert throughput[16] > 2 * throughput[1]
+
+
+async def test_memory_growth(stub_server, openai_service):
+    """Memory doesn't grow with the number of calls once caches are filled."""
+    _, service = await warm_service(stub_server, openai_service)
+
+    async def settled_memory() -> int:
+        # The event loop holds on to the last finished `gather` until it runs again.
+        await run_calls(service, 1, 1, offset=-5)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    try:
+        await run_calls(service, MEMORY_CALLS // 4, MEMORY_CONCURRENCY)
+        before = await settled_memory()
+        await run_calls(service, MEMORY_CALLS, MEMORY_CONCURRENCY, offset=MEMORY_CALLS)
+        growth = (await settled_memory() - before) / MEMORY_CALLS
+    finally:
+        tracemalloc.stop()
+    print(f"memory growth {growth:.0f} bytes per call")
+    assert growth < MAX_MEMORY_GROWTH_PER_CALL
+
+
+async def test_identical_calls_are_cached(stub_server, openai_service):
+    """Identical overlapping and later calls send a single request."""
+    server = await stub_server(latency=LATENCY)
+    service = openai_service(server.url, {"cache_ttl": 60})
+    responses = await asyncio.gather(
+        *(service.chat_completion(service_call(message=message(0))) for _ in range(20))
+    )
+    responses.append(await service.chat_completion(service_call(message=message(0))))
+    assert server.received == 1
+    assert all(response == responses[0] for response in responses)
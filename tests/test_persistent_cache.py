@@ -0,0 +1,76 @@
+"""
+The persistent response cache loads its shards on use, evicts the least
+recently used entries and survives a restart.
+"""
+from __future__ import annotations
+
+from helpers import service_call
+
+from custom_components.openai_service.integrations.openai_service import OpenAIService
+from custom_components.openai_service.integrations.persistent_cache import (
+    SHARDS,
+    PersistentResponseCache,
+)
+
+OPTIONS = {"persistent_cache_ttl": 3600, "persistent_cache_size": 100}
+
+
+def key(shard: int, number: int = 0) -> str:
+    """Returns a cache key stored in `shard`."""
+    return f"{shard:02x}{number:062x}"
+
+
+async def test_shards_are_loaded_on_use(hass):
+    """Loading reads only the index, each shard is read the first time it's used."""
+    cache = PersistentResponseCache(hass, "entry", 3600, 100)
+    for shard in range(SHARDS):
+        await cache.async_set(key(shard), {"response": f"Shard {shard}."})
+    await cache.async_flush()
+
+    reloaded = PersistentResponseCache(hass, "entry", 3600, 100)
+    await reloaded.async_load()
+    assert (reloaded.stats["entries"], reloaded.stats["loaded_shards"]) == (SHARDS, 0)
+    assert await reloaded.async_get(key(3)) == {"response": "Shard 3."}
+    assert await reloaded.async_get(key(3, 1)) is None
+    assert (reloaded.stats["loaded_shards"], reloaded.loads) == (1, 1)
+
+
+async def test_least_recently_used_is_evicted(hass):
+    """A full cache evicts the entry that was used longest ago."""
+    cache = PersistentResponseCache(hass, "entry", 3600, 2)
+    await cache.async_set(key(0), {"response": "First."})
+    await cache.async_set(key(1), {"response": "Second."})
+    await cache.async_get(key(0))
+    await cache.async_set(key(2), {"response": "Third."})
+    assert await cache.async_get(key(1)) is None
+    assert await cache.async_get(key(0)) == {"response": "First."}
+    assert await cache.async_get(key(2)) == {"response": "Third."}
+    assert cache.evictions == 1
+
+    # Entries evicted while their shard wasn't loaded are dropped on load.
+    await cache.async_flush()
+    reloaded = PersistentResponseCache(hass, "entry", 3600, 1)
+    await reloaded.async_load()
+    assert reloaded.stats["entries"] == 1
+    assert await reloaded.async_get(key(0)) is None
+    assert await reloaded.async_get(key(2)) == {"response": "Third."}
+
+
+async def test_responses_survive_a_restart(hass, stub_server, openai_service):
+    """A flushed response is answered from the cache after the service restarts."""
+    server = await stub_server()
+    service = openai_service(server.url, OPTIONS)
+    await service.persistent_cache.async_load()
+    first = await service.chat_completion(service_call(message="Hello."))
+    await service.persistent_cache.async_flush()
+
+    await service.async_close()
+
+    restarted = OpenAIService(hass, service.entry)
+    try:
+        await restarted.persistent_cache.async_load()
+        assert await restarted.chat_completion(service_call(message="Hello.")) == first
+    finally:
+        await restarted.async_close()
+    assert server.received == 1
+    assert restarted.persistent_cache.hits == 1
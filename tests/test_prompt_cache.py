@@ -0,0 +1,27 @@
+"""
+The prompt cache option only adds hints, the messages stay the same.
+"""
+from __future__ import annotations
+
+from helpers import service_call
+
+
+async def test_messages_unchanged_with_prompt_cache(stub_server, openai_service):
+    """A mood of the call replaces the configured mood, with or without the option."""
+    server = await stub_server()
+    for prompt_cache in (False, True):
+        service = openai_service(server.url, {"mood": "Be brief.", "prompt_cache": prompt_cache})
+        await service.chat_completion(service_call(message="Hi.", mood="Be a pirate."))
+        assert server.requests[-1]["messages"] == [
+            {"role": "system", "content": "Be a pirate."},
+            {"role": "user", "content": "Hi."},
+        ]
+
+
+async def test_prompt_cache_hints(stub_server, openai_service):
+    """Custom endpoints get `cache_prompt` and the configured slot."""
+    server = await stub_server()
+    service = openai_service(server.url, {"prompt_cache": True, "prompt_cache_slot": 2})
+    await service.chat_completion(service_call(message="Hi."))
+    assert server.requests[-1]["cache_prompt"] is True
+    assert server.requests[-1]["id_slot"] == 2
@@ -0,0 +1,66 @@
+"""
+Retries and the circuit breaker against a failing stub server.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from helpers import service_call
+
+from custom_components.openai_service.integrations.resilience import EndpointUnavailable
+
+
+async def test_retry_after_is_honoured(stub_server, openai_service):
+    """A `Retry-After` header sets the delay before the retry."""
+    server = await stub_server()
+    service = openai_service(server.url, {"max_retries": 1, "retry_delay": 0})
+    server.fail_next(1, status=429, retry_after=0.3)
+    started = time.perf_counter()
+    response = await service.chat_completion(service_call(message="Hello."))
+    assert time.perf_counter() - started >= 0.3
+    assert response["response"] == "You said: Hello."
+    assert (server.received, service.retry_policy.retries) == (2, 1)
+
+
+async def test_client_errors_are_not_retried(stub_server, openai_service):
+    """Errors that won't go away, like a bad request, fail right away."""
+    server = await stub_server()
+    service = openai_service(server.url, {"max_retries": 3, "retry_delay": 0})
+    server.fail_next(1, status=400)
+    with pytest.raises(Exception):
+        await service.chat_completion(service_call(message="Hello."))
+    assert server.received == 1
+    assert service.breaker.failures == 0
+
+
+async def test_breaker_opens_and_half_opens(stub_server, openai_service):
+    """The breaker opens after the threshold, lets one request through after
+    the reset timeout, opens again on failure and closes on success."""
+    server = await stub_server()
+    service = openai_service(
+        server.url, {"max_retries": 0, "breaker_threshold": 2, "breaker_reset": 0.1}
+    )
+    server.fail_next(2)
+    for number in range(2):
+        with pytest.raises(Exception):
+            await service.chat_completion(service_call(message=f"Fail {number}."))
+    assert service.breaker.state == "open"
+    with pytest.raises(EndpointUnavailable):
+        await service.chat_completion(service_call(message="Paused."))
+    assert server.received == 2
+
+    await asyncio.sleep(0.1)
+    assert service.breaker.state == "half_open"
+    server.fail_next(1)
+    with pytest.raises(Exception):
+        await service.chat_completion(service_call(message="Probe."))
+    assert service.breaker.state == "open"
+    assert service.breaker.opened == 2
+
+    await asyncio.sleep(0.1)
+    await service.chat_completion(service_call(message="Back."))
+    assert service.breaker.state == "closed"
+    assert server.received == 4
@@ -0,0 +1,84 @@
+"""
+The request scheduler limits concurrent requests and queues the rest.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from custom_components.openai_service.integrations.scheduler import (
+    QueueFull,
+    QueueTimeout,
+    RequestScheduler,
+)
+
+
+async def hold(scheduler: RequestScheduler, started: list, name: str, priority: str, release):
+    """Records when the request gets a slot and holds it until `release` is set."""
+    async with scheduler.slot(priority):
+        started.append(name)
+        await release.wait()
+
+
+async def test_priority_order():
+    """Waiting requests get the slot by priority, then by arrival."""
+    scheduler = RequestScheduler(1, 10, 5)
+    started: list[str] = []
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(scheduler, started, "first", "normal", release))]
+    await asyncio.sleep(0)
+    for name, priority in (("low", "low"), ("normal", "normal"), ("high", "high")):
+        tasks.append(asyncio.create_task(hold(scheduler, started, name, priority, release)))
+        await asyncio.sleep(0)
+    assert scheduler.stats["queued"] == 3
+    release.set()
+    await asyncio.gather(*tasks)
+    assert started == ["first", "high", "normal", "low"]
+    assert scheduler.stats["in_flight"] == 0
+
+
+async def test_queue_full():
+    """Requests beyond `max_queued` are rejected right away."""
+    scheduler = RequestScheduler(1, 1, 5)
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(scheduler, [], name, "normal", release)) for name in "ab"]
+    await asyncio.sleep(0)
+    with pytest.raises(QueueFull):
+        async with scheduler.slot():
+            pass
+    assert scheduler.rejected == 1
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+async def test_queue_timeout():
+    """Requests that wait longer than `queue_timeout` fail and leave the queue."""
+    scheduler = RequestScheduler(1, 10, 0.05)
+    release = asyncio.Event()
+    task = asyncio.create_task(hold(scheduler, [], "a", "normal", release))
+    await asyncio.sleep(0)
+    with pytest.raises(QueueTimeout):
+        async with scheduler.slot():
+            pass
+    assert scheduler.stats["queued"] == 0
+    assert scheduler.timed_out == 1
+    release.set()
+    await task
+    assert scheduler.stats["in_flight"] == 0
+
+
+async def test_cancelled_before_release():
+    """A queued request that is cancelled just before the slot is released
+    raises `CancelledError` and doesn't keep the slot."""
+    scheduler = RequestScheduler(1, 10, 5)
+    held = scheduler.slot()
+    await held.__aenter__()  # pylint: disable=unnecessary-dunder-call
+    waiter = asyncio.create_task(hold(scheduler, [], "waiter", "normal", asyncio.Event()))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    # Releases the slot before the cancelled waiter gets to run.
+    await held.__aexit__(None, None, None)
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert (scheduler.stats["in_flight"], scheduler.stats["queued"]) == (0, 0)
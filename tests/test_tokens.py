@@ -0,0 +1,53 @@
+"""
+Prompt tokens are counted with the model's tokenizer once it is loaded.
+"""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.openai_service.integrations import tokens
+from custom_components.openai_service.integrations.tokens import TokenEstimator
+
+
+class WordEncoding:
+    """A tokenizer with one token per word, in place of a `tiktoken.Encoding`."""
+    name = "words"
+
+    @staticmethod
+    def encode_ordinary(text: str) -> list:
+        """Returns the tokens of `text`."""
+        return text.split()
+
+
+def test_model_is_read_from_the_entry(hass, openai_service):
+    """The tokenizer is loaded for the model of the config flow, unless the
+    options override it."""
+    service = openai_service("http://127.0.0.1:1/v1", data={"model": "gpt-4o"})
+    assert service.model == service.tokens.model == "gpt-4o"
+    service = openai_service("http://127.0.0.1:1/v1", {"model": "gpt-4"}, {"model": "gpt-4o"})
+    assert service.tokens.model == "gpt-4"
+
+
+def test_loaded_encoding_is_used(monkeypatch):
+    """After `load` tokens are counted with the encoding of the model."""
+    monkeypatch.setattr(
+        tokens, "load_encoding", lambda model: WordEncoding() if model == "gpt-4o" else None
+    )
+    estimator = TokenEstimator("gpt-4o", 4096)
+    assert estimator.tokenizer == "heuristic"
+    estimator.load()
+    assert estimator.stats["tokenizer"] == "words"
+    assert estimator.count("one two three four") == 4
+    messages = [{"role": "user", "content": "one two three"}]
+    assert estimator.estimate(messages) == tokens.REPLY_OVERHEAD + tokens.MESSAGE_OVERHEAD + 3
+
+
+def test_tiktoken_encoding():
+    """With `tiktoken` installed, known models get their tokenizer."""
+    pytest.importorskip("tiktoken")
+    tokens.load_encoding.cache_clear()
+    estimator = TokenEstimator("gpt-4o", 4096)
+    estimator.load()
+    if estimator.tokenizer == "heuristic":
+        pytest.skip("the tokenizer of gpt-4o could not be downloaded")
+    assert estimator.count("Hello world") == 2
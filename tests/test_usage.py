@@ -0,0 +1,112 @@
+"""
+Token usage is priced by the configured model and the rate limiter only
+keeps the tokens that were used, delays or rejects requests over the limit.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from helpers import service_call
+
+from custom_components.openai_service.integrations.openai_service import OpenAIService
+from custom_components.openai_service.integrations.rate_limit import RateLimited
+from custom_components.openai_service.sensor import SENSORS, OpenAIServiceSensor
+
+TOKENS_PER_MINUTE = 1000
+
+
+def test_openai_model_is_priced(hass, openai_service):
+    """OpenAI models of the config flow are priced at their list price."""
+    service = openai_service(
+        "http://127.0.0.1:1/v1", data={"endpoint_type": "openai", "model": "gpt-4o"}
+    )
+    assert (service.usage.prompt_price, service.usage.completion_price) == (5.0, 15.0)
+    service = openai_service("http://127.0.0.1:1/v1", data={"model": "gpt-4o"})
+    assert (service.usage.prompt_price, service.usage.completion_price) == (0.0, 0.0)
+
+
+async def test_failed_request_is_refunded(stub_server, openai_service):
+    """A failed attempt gives its reserved tokens back."""
+    server = await stub_server()
+    service = openai_service(
+        server.url, {"max_retries": 0, "tokens_per_minute": TOKENS_PER_MINUTE}
+    )
+    server.fail_next(1)
+    with pytest.raises(Exception):
+        await service.chat_completion(service_call(message="Hello."))
+    assert service.rate_limiter.tokens.level == pytest.approx(TOKENS_PER_MINUTE)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+async def test_usage_without_report_is_estimated(stub_server, openai_service, stream):
+    """Without reported usage, the estimate is kept instead of `max_tokens`."""
+    # The bucket refills while the language model loads, load it beforehand.
+    OpenAIService.warm_up(None)
+    server = await stub_server(report_usage=False)
+    service = openai_service(server.url, {"tokens_per_minute": TOKENS_PER_MINUTE})
+    await service.chat_completion(service_call(message="Hello.", stream=stream))
+    messages = server.requests[-1]["messages"]
+    used = service.tokens.estimate(messages) + service.tokens.count("You said: Hello.")
+    assert service.rate_limiter.tokens.level == pytest.approx(TOKENS_PER_MINUTE - used, abs=2)
+
+
+
+async def test_rate_limit_rejects(stub_server, openai_service):
+    """In `reject` mode a request over the limit fails without being sent."""
+    server = await stub_server()
+    service = openai_service(
+        server.url, {"requests_per_minute": 1, "rate_limit_mode": "reject"}
+    )
+    await service.chat_completion(service_call(message="Hello."))
+    with pytest.raises(RateLimited):
+        await service.chat_completion(service_call(message="Hello again."))
+    assert server.received == 1
+    assert (service.rate_limiter.rejected, service.rate_limiter.delayed) == (1, 0)
+
+
+async def test_rate_limit_queues(stub_server, openai_service):
+    """In `queue` mode a request over the limit waits for the bucket to refill,
+    unless that takes longer than the queue timeout."""
+    server = await stub_server()
+    # One request every 0.1 seconds.
+    service = openai_service(
+        server.url,
+        {"requests_per_minute": 600, "rate_limit_mode": "queue", "queue_timeout": 1},
+    )
+    service.rate_limiter.requests.take(service.rate_limiter.requests.capacity - 1)
+    started = time.perf_counter()
+    responses = await asyncio.gather(
+        *(service.chat_completion(service_call(message=f"Hello {i}.")) for i in range(3))
+    )
+    assert time.perf_counter() - started >= 0.2
+    assert [response["response"] for response in responses] == [
+        f"You said: Hello {i}." for i in range(3)
+    ]
+    assert (service.rate_limiter.rejected, service.rate_limiter.delayed) == (0, 2)
+
+    service.rate_limiter.requests.take(service.rate_limiter.requests.capacity + 20)
+    with pytest.raises(RateLimited):
+        await service.chat_completion(service_call(message="Too late."))
+    assert server.received == 3
+    assert service.rate_limiter.rejected == 1
+
+
+async def test_request_over_the_token_limit_is_rejected(stub_server, openai_service):
+    """A request that needs more tokens than the bucket holds never waits."""
+    server = await stub_server()
+    service = openai_service(server.url, {"tokens_per_minute": 100, "max_tokens": 200})
+    started = time.perf_counter()
+    with pytest.raises(RateLimited):
+        await service.chat_completion(service_call(message="Hello."))
+    assert time.perf_counter() - started < 0.5
+    assert server.received == 0
+
+
+def test_sensor_device_reports_the_model(hass, openai_service):
+    """The device of the sensors shows the model of the config flow."""
+    service = openai_service("http://127.0.0.1:1/v1", data={"model": "gpt-4o"})
+    sensor = OpenAIServiceSensor(service.entry, service, SENSORS[0])
+    assert sensor.device_info["model"] == "gpt-4o"